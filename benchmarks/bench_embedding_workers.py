@@ -0,0 +1,43 @@
+"""
+Embedding throughput (documents/second) versus worker count.
+
+Encodes descriptions from the synthetic catalog with `EmbeddingEngine` at
+several worker x thread layouts, the same engine `DataIngestion` uses.
+
+Usage (from the repository root):
+    python -m benchmarks.bench_embedding_workers --docs 20000 --workers 1 2 4 8 16 --threads 4
+"""
+import argparse
+import time
+
+from data_ingestion import Config
+from synthetic_data_generation import generate_books
+from tools.embedding_tools import EmbeddingEngine
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure embedding throughput per worker count.")
+    parser.add_argument("--docs", type=int, default=10000)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--threads", type=int, default=0, help="Torch threads per worker (0 = torch default).")
+    parser.add_argument("--batch-size", type=int, default=Config.embedding_batch_size)
+    parser.add_argument("--model", default=Config.embedding_model)
+    args = parser.parse_args()
+
+    texts = [book["description"] for book in generate_books("store_a", 0, args.docs)]
+
+    print(f"{'workers':>7} {'threads':>7} {'docs/s':>10} {'seconds':>9}")
+    for workers in args.workers:
+        engine = EmbeddingEngine(args.model, workers=workers, threads_per_worker=args.threads)
+        # Warm up so model loading and first-call overhead aren't measured
+        engine.encode(texts[:workers * 8], batch_size=args.batch_size)
+
+        start = time.perf_counter()
+        engine.encode(texts, batch_size=args.batch_size)
+        elapsed = time.perf_counter() - start
+        engine.close()
+        print(f"{workers:>7} {args.threads:>7} {len(texts) / elapsed:>10.1f} {elapsed:>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
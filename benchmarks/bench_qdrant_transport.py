@@ -0,0 +1,84 @@
+"""
+REST vs gRPC throughput benchmark against a local Qdrant.
+
+Upserts random vectors into a scratch collection and runs random searches
+over each transport, using the same client construction path as the app
+(`create_qdrant_client`).
+
+Usage (from the repository root, with Qdrant listening on 6333/6334):
+    python -m benchmarks.bench_qdrant_transport --points 50000 --searches 2000
+"""
+import argparse
+import dataclasses
+import time
+
+import numpy as np
+from qdrant_client.models import Distance, PointStruct, VectorParams
+
+from data_ingestion import Config, create_qdrant_client
+
+COLLECTION = "bench_transport"
+
+
+def bench_transport(config: Config, vectors: np.ndarray, queries: np.ndarray, batch_size: int) -> dict:
+    client = create_qdrant_client(config)
+    if client.collection_exists(COLLECTION):
+        client.delete_collection(COLLECTION)
+    client.create_collection(
+        collection_name=COLLECTION,
+        vectors_config=VectorParams(size=vectors.shape[1], distance=Distance.COSINE)
+    )
+
+    start = time.perf_counter()
+    for offset in range(0, len(vectors), batch_size):
+        batch = vectors[offset:offset + batch_size]
+        client.upsert(
+            collection_name=COLLECTION,
+            points=[
+                PointStruct(id=offset + i, vector=vector.tolist(), payload={"store": f"store_{i % 2}"})
+                for i, vector in enumerate(batch)
+            ],
+            wait=True
+        )
+    upsert_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for query in queries:
+        client.query_points(collection_name=COLLECTION, query=query.tolist(), limit=10, with_payload=True)
+    search_seconds = time.perf_counter() - start
+
+    client.delete_collection(COLLECTION)
+    client.close()
+    return {
+        "upsert_points_per_s": len(vectors) / upsert_seconds,
+        "searches_per_s": len(queries) / search_seconds,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare Qdrant REST and gRPC throughput.")
+    parser.add_argument("--points", type=int, default=20000)
+    parser.add_argument("--searches", type=int, default=1000)
+    parser.add_argument("--dim", type=int, default=Config.vector_size)
+    parser.add_argument("--batch-size", type=int, default=256)
+    parser.add_argument("--compression", default=None, help="gRPC compression, e.g. 'gzip'.")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(42)
+    vectors = rng.standard_normal((args.points, args.dim), dtype=np.float32)
+    queries = rng.standard_normal((args.searches, args.dim), dtype=np.float32)
+
+    base = Config()
+    transports = {
+        "rest": dataclasses.replace(base, prefer_grpc=False),
+        "grpc": dataclasses.replace(base, prefer_grpc=True, qdrant_grpc_compression=args.compression),
+    }
+
+    print(f"{'transport':<10} {'upsert pts/s':>14} {'searches/s':>12}")
+    for name, config in transports.items():
+        result = bench_transport(config, vectors, queries, args.batch_size)
+        print(f"{name:<10} {result['upsert_points_per_s']:>14.0f} {result['searches_per_s']:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
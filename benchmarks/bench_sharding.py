@@ -0,0 +1,121 @@
+"""
+Store-sharded vs. unsharded collection benchmark against a multi-node Qdrant.
+
+Ingests the same generated catalog twice through `DataIngestion`: once into
+a regular collection and once with `shard_by_store` (one custom shard key
+per store). It then runs concurrent store-pinned searches against each
+collection through `QdrantSearcher`, so the sharded run only touches the
+pinned store's shards. Vectors come from the seeded random encoder, so no
+model download is needed.
+
+Usage (from the repository root):
+    docker compose -f benchmarks/docker-compose.cluster.yml up -d
+    python -m benchmarks.bench_sharding --books 200000 --searches 5000 --concurrency 32
+    docker compose -f benchmarks/docker-compose.cluster.yml down
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from benchmarks.load_test_service import percentile
+from benchmarks.run_benchmarks import prepare_feeds
+from data_ingestion import Config, DataIngestion, create_qdrant_client
+from tools.qdrant_tools import QdrantSearcher
+from tools.store_adapters import STORE_ADAPTERS
+
+
+def ingest(config: Config) -> float:
+    ingestion = DataIngestion(config)
+    start = time.perf_counter()
+    ingestion.setup_collection()
+    ingestion.match_books(list(STORE_ADAPTERS.values()))
+    ingestion.ingest_stores(list(STORE_ADAPTERS.values()))
+    ingestion.publish_collection()
+    ingestion.embedding_model.close()
+    return time.perf_counter() - start
+
+
+def bench_searches(config: Config, searches: int, concurrency: int, pinned: float) -> dict:
+    searcher = QdrantSearcher(
+        client=create_qdrant_client(config),
+        collection_name=config.collection_name,
+        shard_key_field="store"
+    )
+    rng = np.random.default_rng(7)
+    picker = random.Random(7)
+    stores = list(STORE_ADAPTERS)
+    queries = []
+    for vector in rng.standard_normal((searches, config.vector_size), dtype=np.float32):
+        must = [{"key": "store", "match": {"value": picker.choice(stores)}}] if picker.random() < pinned else []
+        queries.append((vector.tolist(), searcher.build_qdrant_filter({"must": must})))
+
+    def run(query) -> float:
+        start = time.perf_counter()
+        searcher.search(query_embedding=query[0], qdrant_filter=query[1], limit=10)
+        return time.perf_counter() - start
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        latencies = list(executor.map(run, queries))
+    elapsed = time.perf_counter() - start
+    return {
+        "searches_per_s": searches / elapsed,
+        "p50": percentile(latencies, 50),
+        "p99": percentile(latencies, 99),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare store-sharded and unsharded search throughput.")
+    parser.add_argument("--books", type=int, default=200_000, help="Catalog size (total across stores).")
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--searches", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--pinned", type=float, default=1.0, help="Fraction of searches that filter on a store.")
+    parser.add_argument("--shards-per-store", type=int, default=2)
+    parser.add_argument("--replication-factor", type=int, default=2)
+    parser.add_argument("--host", default="localhost")
+    parser.add_argument("--grpc", action="store_true", help="Use gRPC instead of REST.")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Catalog generator processes.")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="bookstore-sharding-") as workdir:
+        prepare_feeds(args.books, workdir, args.workers)
+        base = dict(
+            qdrant_url=args.host,
+            prefer_grpc=args.grpc,
+            qdrant_pool_size=args.concurrency,
+            embedding_model=f"random:{args.dim}",
+            vector_size=args.dim,
+            keep_collection_versions=1,
+            collection_version_path=os.path.join(workdir, "collection_version"),
+            price_table_path=os.path.join(workdir, "price_comparison.sqlite"),
+            replication_factor=args.replication_factor,
+            timing_logs=False,
+        )
+        layouts = {
+            "unsharded": Config(collection_name="bench_sharding_flat", **base),
+            "by store": Config(collection_name="bench_sharding_store", shard_by_store=True,
+                               shards_per_store=args.shards_per_store, **base),
+        }
+
+        results = {}
+        for name, config in layouts.items():
+            print(f"\n🏁 Ingesting {args.books} books into the {name} collection")
+            ingest_seconds = ingest(config)
+            results[name] = {"ingest_docs_per_s": args.books / ingest_seconds,
+                             **bench_searches(config, args.searches, args.concurrency, args.pinned)}
+
+    print(f"\n{'layout':<10} {'ingest docs/s':>14} {'searches/s':>12} {'p50 ms':>8} {'p99 ms':>8}")
+    for name, result in results.items():
+        print(f"{name:<10} {result['ingest_docs_per_s']:>14.0f} {result['searches_per_s']:>12.1f} "
+              f"{result['p50'] * 1000:>8.1f} {result['p99'] * 1000:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""
+Load test for the HTTP query service (service.py).
+
+Starts the stub OpenAI endpoint and the service against a local Qdrant, then
+drives `/search` (or another route) at a fixed concurrency and reports
+throughput, latency percentiles, shed requests and coalescing stats.
+
+The query mix is small, so with the caches on most requests are cache hits.
+Pass `--no-cache` to start the service with the response cache and the
+query-embedding cache disabled and measure the full pipeline.
+
+Usage (from the repository root, with Qdrant running and data ingested):
+    python -m benchmarks.load_test_service --requests 2000 --concurrency 64
+    python -m benchmarks.load_test_service --requests 2000 --concurrency 64 --no-cache
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import subprocess
+import sys
+import time
+
+import httpx
+
+from benchmarks.stub_openai import start_stub_server
+
+QUERIES = [
+    "show me the cheapest books in the thriller genre",
+    "what are the most popular horror books?",
+    "find me some books by Stephen King",
+    "find me a book about a stranded astronaut",
+    "find highly rated books under $15",
+    "show me fantasy books with good reviews",
+]
+
+
+def percentile(values, pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+async def wait_for_service(client: httpx.AsyncClient, url: str, timeout: float = 300.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            if (await client.get(f"{url}/health")).status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        await asyncio.sleep(1)
+    raise RuntimeError(f"Service at {url} did not become healthy within {timeout}s")
+
+
+async def run_load(url: str, route: str, total: int, concurrency: int, distinct: int):
+    latencies, statuses = [], {}
+    queries = QUERIES[:distinct] if distinct else QUERIES
+    counter = iter(range(total))
+
+    async with httpx.AsyncClient(timeout=120.0, limits=httpx.Limits(max_connections=concurrency)) as client:
+        await wait_for_service(client, url)
+
+        async def worker():
+            for _ in counter:
+                payload = {"query": random.choice(queries)}
+                start = time.perf_counter()
+                try:
+                    response = await client.post(f"{url}/{route}", json=payload)
+                    status = response.status_code
+                except httpx.TransportError:
+                    status = "error"
+                latencies.append(time.perf_counter() - start)
+                statuses[status] = statuses.get(status, 0) + 1
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+        health = (await client.get(f"{url}/health")).json()
+
+    print(f"\n📊 {route}: {total} requests, concurrency {concurrency}, {elapsed:.2f}s")
+    print(f"   Throughput: {total / elapsed:.1f} req/s")
+    print(f"   Latency p50={percentile(latencies, 50) * 1000:.1f}ms "
+          f"p95={percentile(latencies, 95) * 1000:.1f}ms "
+          f"p99={percentile(latencies, 99) * 1000:.1f}ms "
+          f"mean={statistics.mean(latencies) * 1000:.1f}ms")
+    print(f"   Status codes: {statuses}")
+    print(f"   Service stats: {health}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the bookstore HTTP service.")
+    parser.add_argument("--route", default="search", choices=["search", "analytics", "ask"])
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--distinct", type=int, default=0, help="Use only the first N queries (0 = all).")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--stub-latency", type=float, default=0.2, help="Simulated OpenAI latency in seconds.")
+    parser.add_argument("--no-spawn", action="store_true", help="Target an already running service.")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="Disable the response and query-embedding caches in the spawned service.")
+    args = parser.parse_args()
+
+    url = f"http://127.0.0.1:{args.port}"
+    service = None
+    if not args.no_spawn:
+        stub = start_stub_server(latency=args.stub_latency)
+        env = dict(os.environ,
+                   OPENAI_BASE_URL=f"http://127.0.0.1:{stub.server_port}/v1",
+                   OPENAI_API_KEY="stub")
+        if args.no_cache:
+            env.update(BOOKSTORE_CACHE_BACKEND="none", BOOKSTORE_QUERY_EMBEDDING_CACHE_SIZE="0")
+        service = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "service:app", "--port", str(args.port)], env=env
+        )
+
+    try:
+        asyncio.run(run_load(url, args.route, args.requests, args.concurrency, args.distinct))
+    finally:
+        if service is not None:
+            service.terminate()
+            service.wait()
+
+
+if __name__ == "__main__":
+    main()
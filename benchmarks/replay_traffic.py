@@ -0,0 +1,134 @@
+"""
+Replay recorded traffic against the HTTP query service (service.py).
+
+Reads a request log written by the service (`BOOKSTORE_REQUEST_LOG=<path>`)
+and sends the same queries, to the same routes, either open-loop at a fixed
+rate (`--qps`) or closed-loop with a fixed number of in-flight requests
+(`--concurrency`). Reports throughput, latency percentiles per route, status
+codes and the service's cache hit rates.
+
+In `--qps` mode latency is measured from each request's scheduled send time,
+so a service that falls behind shows up as queueing delay instead of a lower
+request rate.
+
+Usage (from the repository root):
+    BOOKSTORE_REQUEST_LOG=data/request_log.jsonl uvicorn service:app   # record
+    python -m benchmarks.replay_traffic data/request_log.jsonl --qps 50 --no-spawn
+    python -m benchmarks.replay_traffic data/request_log.jsonl --concurrency 32 --loops 3
+"""
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import time
+from collections import defaultdict
+
+import httpx
+
+from benchmarks.load_test_service import percentile, wait_for_service
+from benchmarks.stub_openai import start_stub_server
+from tools.traffic_tools import iter_request_log
+
+
+def load_requests(path: str, routes, loops: int, limit: int):
+    entries = list(iter_request_log(path, routes))
+    if not entries:
+        raise SystemExit(f"❌ No requests to replay in {path}")
+    requests = [(entry["route"], payload(entry)) for entry in entries] * loops
+    return requests[:limit] if limit else requests
+
+
+def payload(entry: dict) -> dict:
+    body = {"query": entry["query"]}
+    if entry["route"] == "search" and "limit" in entry:
+        body["limit"] = entry["limit"]
+    return body
+
+
+async def replay(url: str, requests, qps: float, concurrency: int):
+    latencies, statuses = defaultdict(list), defaultdict(int)
+
+    async with httpx.AsyncClient(timeout=300.0, limits=httpx.Limits(max_connections=None)) as client:
+        await wait_for_service(client, url)
+
+        async def send(route: str, body: dict, scheduled: float):
+            try:
+                response = await client.post(f"{url}/{route}", json=body)
+                status = response.status_code
+            except httpx.TransportError:
+                status = "error"
+            latencies[route].append(time.perf_counter() - scheduled)
+            statuses[status] += 1
+
+        start = time.perf_counter()
+        if qps:
+            tasks = []
+            for i, (route, body) in enumerate(requests):
+                scheduled = start + i / qps
+                await asyncio.sleep(max(0.0, scheduled - time.perf_counter()))
+                tasks.append(asyncio.create_task(send(route, body, scheduled)))
+            await asyncio.gather(*tasks)
+        else:
+            pending = iter(requests)
+
+            async def worker():
+                for route, body in pending:
+                    await send(route, body, time.perf_counter())
+
+            await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+        health = (await client.get(f"{url}/health")).json()
+
+    mode = f"{qps} req/s offered" if qps else f"concurrency {concurrency}"
+    print(f"\n📊 Replayed {len(requests)} requests ({mode}) in {elapsed:.2f}s")
+    print(f"   Throughput: {len(requests) / elapsed:.1f} req/s")
+    for route, values in sorted(latencies.items()):
+        print(f"   {route}: n={len(values)} "
+              f"p50={percentile(values, 50) * 1000:.1f}ms "
+              f"p95={percentile(values, 95) * 1000:.1f}ms "
+              f"p99={percentile(values, 99) * 1000:.1f}ms")
+    print(f"   Status codes: {dict(statuses)}")
+    print(f"   Cache: {health['cache']}")
+    print(f"   Coalesced: {health['coalesced']}, rejected: {health['rejected']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay a recorded request log against the service.")
+    parser.add_argument("log", help="Request log written with BOOKSTORE_REQUEST_LOG.")
+    rate = parser.add_mutually_exclusive_group()
+    rate.add_argument("--qps", type=float, default=0, help="Open-loop send rate.")
+    rate.add_argument("--concurrency", type=int, default=16, help="Closed-loop in-flight requests.")
+    parser.add_argument("--routes", nargs="+", choices=["search", "analytics", "ask"],
+                        help="Only replay these routes (default: all).")
+    parser.add_argument("--loops", type=int, default=1, help="Replay the log this many times.")
+    parser.add_argument("--limit", type=int, default=0, help="Stop after N requests (0 = all).")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--stub-latency", type=float, default=0.2, help="Simulated OpenAI latency in seconds.")
+    parser.add_argument("--no-spawn", action="store_true", help="Target an already running service.")
+    args = parser.parse_args()
+
+    requests = load_requests(args.log, args.routes, args.loops, args.limit)
+    url = f"http://127.0.0.1:{args.port}"
+    service = None
+    if not args.no_spawn:
+        stub = start_stub_server(latency=args.stub_latency)
+        env = dict(os.environ,
+                   OPENAI_BASE_URL=f"http://127.0.0.1:{stub.server_port}/v1",
+                   OPENAI_API_KEY="stub")
+        # Don't append the replayed traffic to the log being replayed
+        env.pop("BOOKSTORE_REQUEST_LOG", None)
+        service = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "service:app", "--port", str(args.port)], env=env
+        )
+
+    try:
+        asyncio.run(replay(url, requests, args.qps, args.concurrency))
+    finally:
+        if service is not None:
+            service.terminate()
+            service.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,229 @@
+"""
+End-to-end benchmark suite that runs fully offline.
+
+Uses an in-process Qdrant (`Config.qdrant_location`), the seeded random
+encoder (`embedding_model="random:<dim>"`) and the stub OpenAI server, and
+measures, for each catalog size:
+
+- ingestion throughput (generated JSONL feeds -> normalized -> embedded -> upserted)
+- `search()` end-to-end and per-stage latency, plus `search_many` throughput
+- `BookAnalyticsTool` latency per analytical query
+- `main.py` batch throughput (full crew runs against the stub)
+
+Results are written as JSON under results/benchmarks/ so runs from
+different commits can be compared with `--compare`.
+
+Usage (from the repository root):
+    python -m benchmarks.run_benchmarks --sizes 1000 100000 1000000
+    python -m benchmarks.run_benchmarks --sizes 1000 --compare results/benchmarks/<baseline>.json
+"""
+import argparse
+import dataclasses
+import json
+import os
+import subprocess
+import tempfile
+import time
+
+from benchmarks.stub_openai import start_stub_server
+from data_ingestion import Config, DataIngestion, set_default_config
+from synthetic_data_generation import generate_catalog
+from tools.metrics_tools import metrics
+from tools.store_adapters import STORE_ADAPTERS, register_store_adapter
+
+SEARCH_QUERIES = [
+    "show me the cheapest books in the thriller genre",
+    "find me some books by Stephen King",
+    "find me a book about a stranded astronaut",
+    "find highly rated books under $15",
+    "show me fantasy books with good reviews",
+    "a detective uncovers a conspiracy in a coastal town",
+    "science fiction about a generation ship",
+    "memoir about grief and resilience",
+]
+ANALYTICS_QUERIES = [
+    "compare the average price of books between stores",
+    "what is the most popular genre in each bookstore?",
+    "show me the cheapest books in the thriller genre",
+]
+
+# Metrics where a larger value is better; everything else is a latency
+HIGHER_IS_BETTER = ("docs_per_s", "queries_per_s")
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def prepare_feeds(size: int, workdir: str, workers: int):
+    """Generate a catalog of `size` books (split across the stores) and point the adapters at it."""
+    out_dir = os.path.join(workdir, f"catalog_{size}")
+    stores = list(STORE_ADAPTERS)
+    generate_catalog(stores, size // len(stores), fmt="jsonl", out_dir=out_dir, workers=workers)
+    for store in stores:
+        register_store_adapter(dataclasses.replace(
+            STORE_ADAPTERS[store], feed=os.path.join(out_dir, f"{store}_books-*.jsonl")
+        ))
+
+
+def bench_ingestion(config: Config) -> dict:
+    ingestion = DataIngestion(config)
+    start = time.perf_counter()
+    ingestion.setup_collection()
+    ingestion.match_books(list(STORE_ADAPTERS.values()))
+    documents = ingestion.ingest_stores(list(STORE_ADAPTERS.values()))
+    ingestion.publish_collection()
+    elapsed = time.perf_counter() - start
+    ingestion.embedding_model.close()
+    return {"documents": documents, "seconds": round(elapsed, 3), "docs_per_s": round(documents / elapsed, 1)}
+
+
+def bench_search(config: Config, searches: int) -> dict:
+    from book_agent import get_shared_rag_system
+
+    rag_system = get_shared_rag_system(config)
+    queries = [SEARCH_QUERIES[i % len(SEARCH_QUERIES)] for i in range(searches)]
+
+    metrics.reset()
+    start = time.perf_counter()
+    for query in queries:
+        rag_system.search_sync(query)
+    elapsed = time.perf_counter() - start
+    stages = {key.split("=", 1)[1]: value for key, value in metrics.percentiles().items()}
+
+    start = time.perf_counter()
+    rag_system.run_sync(rag_system.search_many(queries))
+    batch_elapsed = time.perf_counter() - start
+
+    return {
+        "queries": searches,
+        "queries_per_s": round(searches / elapsed, 1),
+        "stages": stages,
+        "search_many": {"queries_per_s": round(searches / batch_elapsed, 1)},
+    }
+
+
+def bench_analytics(config: Config, repeats: int) -> dict:
+    try:
+        from tools.crew_tools import BookAnalyticsTool
+    except ImportError as e:
+        return {"skipped": f"crewai not available: {e}"}
+
+    tool = BookAnalyticsTool(config=config)
+    metrics.reset()
+    results = {}
+    for query in ANALYTICS_QUERIES:
+        latencies = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            tool._run(query)
+            latencies.append(time.perf_counter() - start)
+        results[query] = {"p50": round(sorted(latencies)[len(latencies) // 2], 6), "max": round(max(latencies), 6)}
+    results["stages"] = {key.split("=", 1)[1]: value for key, value in metrics.percentiles().items()}
+    return results
+
+
+def bench_batch() -> dict:
+    try:
+        import main
+    except ImportError as e:
+        return {"skipped": f"crewai not available: {e}"}
+
+    start = time.perf_counter()
+    results = main.run_batch(main.DEMO_QUERIES)
+    elapsed = time.perf_counter() - start
+    return {"queries": len(results), "seconds": round(elapsed, 3), "queries_per_s": round(len(results) / elapsed, 3)}
+
+
+def flatten(results: dict, prefix: str = "") -> dict:
+    flat = {}
+    for key, value in results.items():
+        path = f"{prefix}.{key}" if prefix else str(key)
+        if isinstance(value, dict):
+            flat.update(flatten(value, path))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[path] = value
+    return flat
+
+
+def compare(baseline: dict, current: dict, threshold: float):
+    """Print metrics that moved by more than `threshold` (a fraction) between two result files."""
+    old, new = flatten(baseline["sizes"]), flatten(current["sizes"])
+    print(f"\n📊 Comparing {baseline['commit']} -> {current['commit']} (threshold {threshold:.0%})")
+    regressions = 0
+    for key in sorted(old.keys() & new.keys()):
+        if key.endswith((".count", ".queries", ".documents")) or not old[key]:
+            continue
+        change = (new[key] - old[key]) / old[key]
+        worse = change < -threshold if key.endswith(HIGHER_IS_BETTER) else change > threshold
+        better = change > threshold if key.endswith(HIGHER_IS_BETTER) else change < -threshold
+        if worse or better:
+            regressions += worse
+            print(f"  {'❌' if worse else '✅'} {key}: {old[key]} -> {new[key]} ({change:+.1%})")
+    print(f"  {regressions} regression(s)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the offline end-to-end benchmark suite.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 100_000, 1_000_000],
+                        help="Catalog sizes (total books across stores).")
+    parser.add_argument("--searches", type=int, default=200)
+    parser.add_argument("--analytics-repeats", type=int, default=5)
+    parser.add_argument("--dim", type=int, default=64, help="Dimension of the random encoder.")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Catalog generator processes.")
+    parser.add_argument("--qdrant-location", default=":memory:", help="':memory:' or a local path.")
+    parser.add_argument("--skip-batch", action="store_true", help="Skip the main.py crew batch.")
+    parser.add_argument("--out-dir", default="results/benchmarks")
+    parser.add_argument("--compare", help="Baseline results JSON to compare against.")
+    parser.add_argument("--threshold", type=float, default=0.1)
+    args = parser.parse_args()
+
+    stub = start_stub_server()
+    os.environ["OPENAI_BASE_URL"] = f"http://127.0.0.1:{stub.server_port}/v1"
+    os.environ["OPENAI_API_KEY"] = "stub"
+
+    with tempfile.TemporaryDirectory(prefix="bookstore-bench-") as workdir:
+        config = Config(
+            qdrant_location=args.qdrant_location,
+            embedding_model=f"random:{args.dim}",
+            vector_size=args.dim,
+            keep_collection_versions=1,
+            collection_version_path=os.path.join(workdir, "collection_version"),
+            price_table_path=os.path.join(workdir, "price_comparison.sqlite"),
+            # Measure the pipeline, not the caches: the search queries repeat across iterations
+            cache_backend="none",
+            query_embedding_cache_size=0,
+            timing_logs=False,
+        )
+        set_default_config(config)
+
+        report = {"commit": git_commit(), "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                  "config": {"dim": args.dim, "qdrant_location": args.qdrant_location}, "sizes": {}}
+        for size in args.sizes:
+            print(f"\n🏁 Benchmarking a catalog of {size} books")
+            prepare_feeds(size, workdir, args.workers)
+            results = {"ingestion": bench_ingestion(config)}
+            print(f"   Ingestion: {results['ingestion']['docs_per_s']} docs/s")
+            results["search"] = bench_search(config, args.searches)
+            print(f"   Search: {results['search']['queries_per_s']} queries/s")
+            results["analytics"] = bench_analytics(config, args.analytics_repeats)
+            if not args.skip_batch:
+                results["batch"] = bench_batch()
+            report["sizes"][str(size)] = results
+
+    os.makedirs(args.out_dir, exist_ok=True)
+    path = os.path.join(args.out_dir, f"{time.strftime('%Y%m%d-%H%M%S')}-{report['commit']}.json")
+    with open(path, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"\n✅ Results written to {path}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            compare(json.load(f), report, args.threshold)
+
+
+if __name__ == "__main__":
+    main()
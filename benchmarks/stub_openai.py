@@ -0,0 +1,88 @@
+"""
+Minimal OpenAI-compatible stub server for offline load tests and benchmarks.
+
+Serves `POST /v1/chat/completions` with a canned response after an optional
+artificial delay. Point clients at it with `OPENAI_BASE_URL=http://host:port/v1`.
+
+Unless a fixed `content` is given, filter-generation prompts get an empty
+filter and every other prompt (e.g. the CrewAI agent) gets a ReAct-style
+final answer, so whole crew runs complete offline.
+"""
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+
+FILTER_CONTENT = json.dumps({"must": []})
+AGENT_CONTENT = "Thought: I now can give a great answer\nFinal Answer: Here are a few books you might enjoy!"
+
+
+def default_content(request: dict) -> str:
+    prompt = " ".join(str(message.get("content", "")) for message in request.get("messages", []))
+    return FILTER_CONTENT if "Qdrant" in prompt else AGENT_CONTENT
+
+
+def make_handler(content: Optional[str], latency: float):
+    class StubHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        disable_nagle_algorithm = True
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length", 0))
+            request = json.loads(self.rfile.read(length) or b"{}")
+            if latency:
+                time.sleep(latency)
+
+            answer = content or default_content(request)
+            # Rough token counts (~4 characters per token) so usage metrics have something to show
+            prompt_tokens = sum(len(str(m.get("content", ""))) for m in request.get("messages", [])) // 4
+            completion_tokens = len(answer) // 4
+            body = json.dumps({
+                "id": "chatcmpl-stub",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": request.get("model", "stub"),
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": answer},
+                    "finish_reason": "stop"
+                }],
+                "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                          "total_tokens": prompt_tokens + completion_tokens}
+            }).encode()
+            try:
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+            except (BrokenPipeError, ConnectionResetError):
+                pass  # the client gave up (deadline or cancelled hedge)
+
+        def log_message(self, format, *args):
+            pass
+
+    return StubHandler
+
+
+def start_stub_server(host: str = "127.0.0.1", port: int = 0, content: Optional[str] = None,
+                      latency: float = 0.0) -> ThreadingHTTPServer:
+    """Start the stub in a daemon thread and return the server (its bound port is `server.server_port`)."""
+    server = ThreadingHTTPServer((host, port), make_handler(content, latency))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run a stub OpenAI chat completions endpoint.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds to sleep before each response.")
+    parser.add_argument("--content", default=None, help="Fixed assistant message content to return.")
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(args.content, args.latency))
+    print(f"🧪 Stub OpenAI server on http://{args.host}:{args.port}/v1")
+    server.serve_forever()
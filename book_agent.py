@@ -1,28 +1,68 @@
 import json
+import os
 import asyncio
-import time
-from typing import Dict, Optional
+import contextvars
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+import httpx
 
 # Core libraries
-from qdrant_client import QdrantClient
 from qdrant_client.models import (
     Filter, FieldCondition, Match, Range, MatchValue
 )
-from openai import AsyncOpenAI
-from sentence_transformers import SentenceTransformer
+from openai import AsyncOpenAI, DefaultAsyncHttpxClient
 
 # Local imports
-from data_ingestion import Config
-from tools.prompt_tools import generate_filter_query_prompt
+from data_ingestion import Config, create_qdrant_client, get_default_config
+from tools.cache_tools import QueryEmbeddingCache
+from tools.embedding_tools import load_embedding_model
+from tools.filter_tools import parse_filters_locally
+from tools.prompt_tools import FILTER_RESPONSE_FORMAT, build_filter_messages
+from tools.metrics_tools import metrics
+from tools.profiling_tools import profile_current_thread, profiled
 from tools.qdrant_tools import QdrantSearcher
+from tools.traffic_tools import annotate_request, top_queries
 
 class BookstoreRAGSystem:
     def __init__(self, config: Config):
         self.config = config
-        self.client = QdrantClient(host=config.qdrant_url, port=config.qdrant_port)
-        self.embedding_model = SentenceTransformer(config.embedding_model)
-        self.openai_client = AsyncOpenAI()
-        self.qdrant_searcher = QdrantSearcher(client=self.client, collection_name=config.collection_name)
+        self.client = create_qdrant_client(config)
+        self.embedding_model = load_embedding_model(config.embedding_model)
+        self.query_embeddings = QueryEmbeddingCache(self.embedding_model, maxsize=config.query_embedding_cache_size)
+        self.openai_client = AsyncOpenAI(
+            http_client=DefaultAsyncHttpxClient(
+                limits=httpx.Limits(
+                    max_connections=config.openai_max_connections,
+                    max_keepalive_connections=config.openai_max_connections
+                )
+            )
+        )
+        # Store-pinned searches are routed to that store's shard key whenever the live collection is sharded
+        self.qdrant_searcher = QdrantSearcher(client=self.client, collection_name=config.collection_name,
+                                              shard_key_field="store")
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_lock = threading.Lock()
+        # Blocking encoder and Qdrant calls run here, not in the loop's default executor: the service
+        # runs crews there, and their tools wait on `search`, so sharing it can deadlock
+        self._executor = ThreadPoolExecutor(max_workers=config.search_threads, thread_name_prefix="rag-search")
+        metrics.configure(timing_logs=config.timing_logs)
+
+    def bind_event_loop(self, loop: asyncio.AbstractEventLoop):
+        """Pin async calls to a long-running loop so the pooled OpenAI connections are reused."""
+        self._loop = loop
+
+    def warm_up(self):
+        """Initialize the embedding model and pre-encode the most frequent queries from the request log."""
+        path = self.config.request_log_path
+        queries = []
+        if path and os.path.exists(path) and self.config.warmup_queries > 0:
+            queries = top_queries(path, self.config.warmup_queries, routes=["search", "ask"])
+        with metrics.span("warm_up", queries=len(queries)):
+            warmed = self.query_embeddings.warm_up(queries, batch_size=self.config.embedding_batch_size)
+        print(f"🔥 Embedding model warmed up, {warmed} historical queries pre-encoded")
 
     def collection_exists(self) -> bool:
         """Check if the Qdrant collection exists."""
@@ -32,70 +72,184 @@ class BookstoreRAGSystem:
         except Exception:
             return False
 
-    async def generate_filters(self, user_query: str) -> Dict:
-        """Use GPT to generate Qdrant filters from natural language"""
-        try:
-            prompt = generate_filter_query_prompt(user_query)
-            
-            print("📞 Calling OpenAI to generate filters...")
-            response = await self.openai_client.chat.completions.create(
+    async def _complete_hedged(self, messages: List[Dict]):
+        """Return the first successful completion, firing one hedged duplicate if the first is slow."""
+        async def complete():
+            return await self.openai_client.chat.completions.create(
                 model=self.config.openai_model,
-                messages=[
-                    {"role": "system", "content": "You are a database query expert. Return only valid JSON."},
-                    {"role": "user", "content": prompt}
-                ],
+                messages=messages,
+                response_format=FILTER_RESPONSE_FORMAT,
                 temperature=0.1,
                 max_tokens=500
             )
-            
-            filter_json = response.choices[0].message.content.strip()
-            
-            # Clean up the response
-            if filter_json.startswith("```json"):
-                filter_json = filter_json.replace("```json", "").replace("```", "").strip()
-            
-            filters = json.loads(filter_json)
+
+        pending = {asyncio.create_task(complete())}
+        hedge_after = self.config.filter_hedge_after or None
+        error = None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, timeout=hedge_after,
+                                                   return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    metrics.increment("filter_generation_hedges_total",
+                                      help="Hedged LLM filter requests fired after filter_hedge_after")
+                    pending.add(asyncio.create_task(complete()))
+                    hedge_after = None
+                    continue
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def generate_filters(self, user_query: str) -> Dict:
+        """Use GPT to generate Qdrant filters from natural language, within `Config.filter_deadline`"""
+        try:
+            print("📞 Calling OpenAI to generate filters...")
+            with metrics.span("llm_filter_generation"):
+                response = await asyncio.wait_for(
+                    self._complete_hedged(build_filter_messages(user_query)),
+                    timeout=self.config.filter_deadline or None
+                )
+            self._record_token_usage(response.usage)
+
+            # Structured output: the content always matches FILTER_RESPONSE_FORMAT (unless refused)
+            message = response.choices[0].message
+            if message.content is None:
+                raise ValueError(f"Filter generation refused: {getattr(message, 'refusal', None)}")
+            filters = json.loads(message.content)
             print(f"Generated filters: {filters}")
             return filters
             
+        except asyncio.TimeoutError:
+            print(f"⚠️ Filter generation missed its {self.config.filter_deadline}s deadline")
+            metrics.increment("filter_generation_timeouts_total", help="LLM filter generations past the deadline")
+            return self._fallback_filters(user_query, reason="timeout")
         except Exception as e:
             print(f"Error generating filters: {e}")
-            return {"must": []}  # Return empty filter on error
+            metrics.increment("filter_generation_errors_total", help="Failed LLM filter generations")
+            return self._fallback_filters(user_query, reason="error")
 
+    def _record_token_usage(self, usage):
+        """Per-call token counts; the `_sum` series give totals for cost tracking."""
+        if usage is None:
+            return
+        details = getattr(usage, "prompt_tokens_details", None)
+        tokens = {
+            "input": usage.prompt_tokens,
+            "cached_input": getattr(details, "cached_tokens", None) or 0,
+            "output": usage.completion_tokens
+        }
+        for kind, count in tokens.items():
+            metrics.observe("llm_tokens", count, help="Tokens per LLM call",
+                            kind=kind, model=self.config.openai_model)
+        annotate_request(llm_tokens=tokens)
+
+    def _fallback_filters(self, user_query: str, reason: str) -> Dict:
+        """Filters used when the LLM fails or is too slow: the local parser, or none at all.
+
+        They are tagged with `fallback` (the reason) so results built from them are not cached.
+        """
+        metrics.increment("filter_generation_fallbacks_total", help="Filter generations served by the fallback",
+                          reason=reason, fallback=self.config.filter_fallback)
+        if self.config.filter_fallback == "local":
+            filters = parse_filters_locally(user_query)
+            print(f"Local parser filters: {filters}")
+        else:
+            filters = {"must": []}  # Unfiltered vector search
+        filters["fallback"] = reason
+        return filters
+
+
+    async def _run_blocking(self, fn, *args, **kwargs):
+        """Run a blocking call on this system's thread pool, keeping the caller's context (timings, profile)."""
+        call = functools.partial(contextvars.copy_context().run, profiled(fn), *args, **kwargs)
+        return await asyncio.get_running_loop().run_in_executor(self._executor, call)
 
     async def search(self, query: str, limit: int = 10) -> Dict:
         """Main search function"""
         print(f"\n🔍 Processing query: '{query}'")
-        
-        # Step 1: Generate filters using the agent
-        start_time = time.time()
-        filter_dict = await self.generate_filters(query)
-        qdrant_filter = self.qdrant_searcher.build_qdrant_filter(filter_dict)
-        end_time = time.time()
-        print(f"⏱️ Filter generation took: {end_time - start_time:.2f} seconds")
-
-        # Step 2: Create query embedding
-        query_embedding = self.embedding_model.encode([query])[0].tolist()
-
-        # Step 3: Search Qdrant
-        start_time = time.time()
-        search_results = self.qdrant_searcher.search(
-            query_embedding=query_embedding,
-            qdrant_filter=qdrant_filter,
-            limit=limit
+
+        with metrics.span("search"):
+            # Step 1: Generate filters using the agent
+            filter_dict = await self.generate_filters(query)
+            with metrics.span("filter_compilation"):
+                qdrant_filter = self.qdrant_searcher.build_qdrant_filter(filter_dict)
+
+            # Step 2: Create query embedding (CPU-bound, so it runs off the event loop)
+            with metrics.span("query_embedding"):
+                query_embedding = await self._run_blocking(self.query_embeddings.encode_one, query)
+
+            # Step 3: Search Qdrant (a blocking client call)
+            search_results = await self._run_blocking(
+                self.qdrant_searcher.search,
+                query_embedding=query_embedding,
+                qdrant_filter=qdrant_filter,
+                limit=limit
+            )
+
+            # Step 4: Process and format results
+            return self._format_results(query, filter_dict, getattr(search_results, "points", []))
+
+    async def search_many(self, queries: List[str], limit: int = 10) -> List[Dict]:
+        """Batch search: one embedding pass and batched Qdrant requests; results keep input order."""
+        print(f"\n🔍 Processing {len(queries)} queries in batch")
+
+        # Step 1: Generate filters concurrently, bounded to stay within OpenAI rate limits
+        semaphore = asyncio.Semaphore(self.config.filter_concurrency)
+
+        async def bounded_filters(query: str) -> Dict:
+            async with semaphore:
+                return await self.generate_filters(query)
+
+        with metrics.span("batch_filter_generation", queries=len(queries)):
+            filter_dicts = await asyncio.gather(*(bounded_filters(query) for query in queries))
+        with metrics.span("filter_compilation", queries=len(queries)):
+            qdrant_filters = [self.qdrant_searcher.build_qdrant_filter(f) for f in filter_dicts]
+
+        # Step 2: Embed all queries in one batched forward pass
+        with metrics.span("batch_query_embedding", queries=len(queries)):
+            query_embeddings = await self._run_blocking(
+                self.query_embeddings.encode, queries, batch_size=self.config.embedding_batch_size
+            )
+
+        # Step 3: Search Qdrant with batched requests
+        search_results = await self._run_blocking(
+            self.qdrant_searcher.search_batch,
+            query_embeddings=query_embeddings,
+            qdrant_filters=qdrant_filters,
+            limit=limit,
+            batch_size=self.config.search_batch_size
         )
-        end_time = time.time()
-        print(f"⏱️ Qdrant search took: {end_time - start_time:.2f} seconds")
-        
-        # Step 4: Process and format results
+
+        results = []
+        for query, filter_dict, points in zip(queries, filter_dicts, search_results):
+            if isinstance(points, Exception):
+                # Served as an empty answer, but flagged (and kept out of the response cache)
+                result = self._format_results(query, filter_dict, [])
+                result["degraded"] = "search_error"
+                result["error"] = f"Qdrant search failed: {points}"
+            else:
+                result = self._format_results(query, filter_dict, points)
+            results.append(result)
+        return results
+
+    def _format_results(self, query: str, filter_dict: Dict, points: List) -> Dict:
+        """Shape scored points into the response returned by `search`."""
         results = {
             "query": query,
             "filters_applied": filter_dict,
-            "total_results": len(search_results.points),
+            "total_results": len(points),
             "results": []
         }
+        if filter_dict.get("fallback"):
+            # Served, but kept out of the response cache (see ResponseCache.set)
+            results["degraded"] = f"filter_{filter_dict['fallback']}"
         
-        for result in search_results.points:
+        for result in points:
             payload = result.payload
             formatted_result = {
                 "score": round(result.score, 4),
@@ -110,6 +264,42 @@ class BookstoreRAGSystem:
         
         return results
 
+    def run_sync(self, coro):
+        """Run a coroutine from synchronous code on the long-lived loop that owns the OpenAI connections.
+
+        `asyncio.run` would create a new loop per call, and pooled connections
+        opened on an earlier (now closed) loop then fail with "Event loop is closed".
+        """
+        with self._loop_lock:
+            if self._loop is None or not self._loop.is_running():
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name="rag-event-loop", daemon=True).start()
+                self._loop = loop
+
+        async def on_loop():
+            # A cProfile block in the calling thread can't see the loop thread otherwise
+            with profile_current_thread():
+                return await coro
+
+        return asyncio.run_coroutine_threadsafe(on_loop(), self._loop).result()
+
+    def search_sync(self, query: str, limit: int = 10) -> Dict:
+        """Blocking wrapper around `search` for synchronous callers such as CrewAI tools."""
+        return self.run_sync(self.search(query, limit))
+
     def get_all_books(self) -> list:
         """Fetch all books from the Qdrant collection."""
         return self.qdrant_searcher.scroll_all()
+
+
+_shared_systems: Dict[str, BookstoreRAGSystem] = {}
+_shared_systems_lock = threading.Lock()
+
+def get_shared_rag_system(config: Optional[Config] = None) -> BookstoreRAGSystem:
+    """Return a process-wide BookstoreRAGSystem so models and clients are loaded only once per config."""
+    config = config or get_default_config()
+    key = repr(config)
+    with _shared_systems_lock:
+        if key not in _shared_systems:
+            _shared_systems[key] = BookstoreRAGSystem(config)
+        return _shared_systems[key]
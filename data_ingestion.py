@@ -1,148 +1,420 @@
-import json
-import uuid
-from typing import List, Dict
-from dataclasses import dataclass
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from itertools import chain, islice
+from typing import Dict, Iterable, Iterator, List, Optional
+from dataclasses import dataclass, field
 
 from qdrant_client import QdrantClient
-from qdrant_client.models import Distance, VectorParams, PointStruct
-from sentence_transformers import SentenceTransformer
+from qdrant_client.models import (
+    CollectionStatus, CreateAlias, CreateAliasOperation, DeleteAlias, DeleteAliasOperation,
+    Distance, OptimizersConfigDiff, PayloadSchemaType, PointStruct, ShardingMethod, VectorParams
+)
+
+from tools.cache_tools import CollectionVersion
+from tools.embedding_tools import EmbeddingEngine
+from tools.feed_tools import batched, iter_feeds, resolve_feed_paths
+from tools.matching_tools import BookMatcher
+from tools.metrics_tools import metrics
+from tools.price_tools import PriceTableBuilder
+from tools.profiling_tools import profile_block, profiled
+from tools.store_adapters import STORE_ADAPTERS, StoreAdapter
 
 # Configuration
 @dataclass
 class Config:
     qdrant_url: str = "localhost"
     qdrant_port: int = 6333
+    qdrant_grpc_port: int = 6334
+    prefer_grpc: bool = False
+    qdrant_timeout: int = 30
+    qdrant_pool_size: Optional[int] = None  # REST connection limit / number of gRPC channels
+    qdrant_grpc_compression: Optional[str] = None  # "gzip" or None
+    qdrant_location: Optional[str] = None  # ":memory:" or a local path to run Qdrant in-process (no server)
     collection_name: str = "bookstore_collection"
-    embedding_model: str = "Qwen/Qwen3-Embedding-0.6B"
+    embedding_model: str = "Qwen/Qwen3-Embedding-0.6B"  # "random:<dim>" for a seeded offline stand-in
     openai_model: str = "gpt-4o"
+    # LLM filter generation: fire a hedged duplicate request after `filter_hedge_after` seconds,
+    # give up after `filter_deadline` (0 disables either) and fall back to "local" (rule-based
+    # parser) or "none" (unfiltered vector search)
+    filter_hedge_after: float = 2.0
+    filter_deadline: float = 5.0
+    filter_fallback: str = "local"
     vector_size: int = 1024
+    # Print per-stage timings (metrics are recorded either way); BOOKSTORE_TIMING_LOGS=0 silences them
+    timing_logs: bool = field(default_factory=lambda: os.getenv("BOOKSTORE_TIMING_LOGS", "1") != "0")
+    # Mirror spans into OpenTelemetry from the HTTP service (needs the opentelemetry packages)
+    opentelemetry: bool = field(default_factory=lambda: os.getenv("BOOKSTORE_OTEL", "0") == "1")
+    # Opt-in profiling: "cprofile", "sample" (flamegraph stacks) or "memory" (tracemalloc peak)
+    profile_mode: str = field(default_factory=lambda: os.getenv("BOOKSTORE_PROFILE", ""))
+    profile_dir: str = "results/profiles"
+    # Append every served request (route, timings, cache outcome) as JSON lines; empty disables.
+    # Replay with `python -m benchmarks.replay_traffic`.
+    request_log_path: str = field(default_factory=lambda: os.getenv("BOOKSTORE_REQUEST_LOG", ""))
+    # Ingestion (store feeds are declared in tools/store_adapters.py)
+    ingest_batch_size: int = 512
+    ingest_store_parallelism: int = 8
+    embedding_concurrency: int = 2
+    # Ingestion embedding pool: worker processes x torch threads per worker (0 = torch default)
+    embedding_workers: int = 1
+    embedding_threads_per_worker: int = 0
+    # Blue/green reindexing: each run builds "<collection_name>_<timestamp>" and
+    # `collection_name` becomes an alias pointing at the live version
+    keep_collection_versions: int = 2
+    indexing_threshold: int = 20000
+    index_ready_timeout: int = 600
+    collection_version_path: str = "data/collection_version"
+    # Store sharding (Qdrant cluster only): each store gets its own custom shard key, so searches
+    # whose filter pins `store` only touch that store's shards. Applies from the next reindex;
+    # searchers detect the layout of the live collection, so no restart is needed.
+    shard_by_store: bool = False
+    shards_per_store: int = 1
+    # Copies of every shard across cluster nodes, and how many must acknowledge a write
+    replication_factor: int = 1
+    write_consistency_factor: int = 1
+    # Response cache: "lru" (per process), "sqlite" (shared between workers) or "none"
+    # (BOOKSTORE_CACHE_BACKEND); entries also expire after `cache_ttl` seconds (0 = only on reindex)
+    cache_backend: str = field(default_factory=lambda: os.getenv("BOOKSTORE_CACHE_BACKEND", "lru"))
+    cache_ttl: float = 3600.0
+    cache_size: int = 1024
+    cache_path: str = "data/response_cache.sqlite"
+    # Cross-store price comparison table, rebuilt by every ingestion run
+    price_table_path: str = "data/price_comparison.sqlite"
+    embedding_batch_size: int = 64
+    # Query embeddings: in-process LRU (0 disables) and the number of most frequent queries
+    # from the request log pre-encoded at service start
+    query_embedding_cache_size: int = field(
+        default_factory=lambda: int(os.getenv("BOOKSTORE_QUERY_EMBEDDING_CACHE_SIZE", "4096"))
+    )
+    warmup_queries: int = 500
+    # Batch search (BookstoreRAGSystem.search_many)
+    filter_concurrency: int = 16
+    search_batch_size: int = 256
+    # HTTP query service (service.py)
+    service_host: str = "0.0.0.0"
+    service_port: int = 8000
+    service_workers: int = 8
+    # Threads for the blocking encoder/Qdrant calls of concurrent searches (per RAG system)
+    search_threads: int = 8
+    service_queue_size: int = 64
+    openai_max_connections: int = 100
+
+_default_config: Optional[Config] = None
+
+def get_default_config() -> Config:
+    """The Config used by components that build their own (crew tools, main.py, the service)."""
+    return _default_config or Config()
+
+def set_default_config(config: Optional[Config]):
+    """Override the process-wide default Config, e.g. to point benchmarks at a local Qdrant."""
+    global _default_config
+    _default_config = config
+
+_local_clients: Dict[str, QdrantClient] = {}
+_local_clients_lock = threading.Lock()
+
+def create_qdrant_client(config: Config) -> QdrantClient:
+    """Build a QdrantClient using the transport, timeout and pooling settings from Config."""
+    if config.qdrant_location:
+        # Local mode keeps data inside the client, so every component has to share one instance
+        with _local_clients_lock:
+            if config.qdrant_location not in _local_clients:
+                if config.qdrant_location == ":memory:":
+                    _local_clients[config.qdrant_location] = QdrantClient(location=":memory:")
+                else:
+                    _local_clients[config.qdrant_location] = QdrantClient(path=config.qdrant_location)
+            return _local_clients[config.qdrant_location]
+
+    kwargs = {}
+    if config.qdrant_grpc_compression:
+        import grpc
+
+        compression = {"gzip": grpc.Compression.Gzip}.get(config.qdrant_grpc_compression.lower())
+        if compression is None:
+            raise ValueError(f"Unsupported gRPC compression: {config.qdrant_grpc_compression}")
+        kwargs["grpc_compression"] = compression
+
+    return QdrantClient(
+        host=config.qdrant_url,
+        port=config.qdrant_port,
+        grpc_port=config.qdrant_grpc_port,
+        prefer_grpc=config.prefer_grpc,
+        timeout=config.qdrant_timeout,
+        pool_size=config.qdrant_pool_size,
+        **kwargs
+    )
 
 class DataIngestion:
     def __init__(self, config: Config):
         self.config = config
-        self.client = QdrantClient(host=config.qdrant_url, port=config.qdrant_port)
-        self.embedding_model = SentenceTransformer(config.embedding_model)
+        self.client = create_qdrant_client(config)
+        self.embedding_model = EmbeddingEngine(
+            config.embedding_model,
+            workers=config.embedding_workers,
+            threads_per_worker=config.embedding_threads_per_worker
+        )
+        self.target_collection = config.collection_name
+        self._embedding_slots = threading.BoundedSemaphore(config.embedding_concurrency)
+        self.book_matcher = BookMatcher(f"{config.price_table_path}.matching")
+        self.price_table: Optional[PriceTableBuilder] = None
+        # The in-process (local mode) Qdrant client isn't thread-safe, so parallel stores take turns upserting
+        self._upsert_lock = threading.Lock() if config.qdrant_location else nullcontext()
+        if config.shard_by_store and config.qdrant_location:
+            raise ValueError("shard_by_store needs a Qdrant server; local mode does not support sharding")
+        if config.keep_collection_versions < 1:
+            raise ValueError("keep_collection_versions must be at least 1 (the live collection)")
+        metrics.configure(timing_logs=config.timing_logs)
+
+    def setup_collection(self) -> str:
+        """Create a fresh versioned collection to build the next index into.
 
-    def setup_collection(self):
-        """Initialize Qdrant collection"""
+        Live traffic keeps hitting the collection behind the `collection_name`
+        alias until `publish_collection` swaps it over.
+        """
+        self.target_collection = self._next_version_name()
         try:
-            # Delete existing collection if it exists
-            try:
-                self.client.delete_collection(self.config.collection_name)
-                print(f"Deleted existing collection: {self.config.collection_name}")
-            except Exception:
-                pass
-
-            # Create new collection
+            sharding = {}
+            if self.config.shard_by_store:
+                sharding = dict(sharding_method=ShardingMethod.CUSTOM, shard_number=self.config.shards_per_store)
+            # HNSW indexing is disabled during the bulk load and enabled again on publish
             self.client.create_collection(
-                collection_name=self.config.collection_name,
+                collection_name=self.target_collection,
                 vectors_config=VectorParams(
                     size=self.config.vector_size,
                     distance=Distance.COSINE
-                )
+                ),
+                optimizers_config=OptimizersConfigDiff(indexing_threshold=0),
+                replication_factor=self.config.replication_factor,
+                write_consistency_factor=self.config.write_consistency_factor,
+                **sharding
             )
-            print(f"Created collection: {self.config.collection_name}")
+            print(f"Created collection: {self.target_collection}")
+            if not self.config.qdrant_location:  # payload indexes are a no-op in local mode
+                self.client.create_payload_index(
+                    collection_name=self.target_collection,
+                    field_name="canonical_id",
+                    field_schema=PayloadSchemaType.KEYWORD
+                )
+
+            if self.config.shard_by_store:
+                for store in STORE_ADAPTERS:
+                    self.client.create_shard_key(
+                        collection_name=self.target_collection,
+                        shard_key=store,
+                        shards_number=self.config.shards_per_store,
+                        replication_factor=self.config.replication_factor
+                    )
+                print(f"Created shard keys: {', '.join(STORE_ADAPTERS)}")
             
         except Exception as e:
+            # Never fall through to indexing: a half-made (or pre-existing) target would then get published
             print(f"Error setting up collection: {e}")
+            raise
+        self.price_table = PriceTableBuilder(self.config.price_table_path)
+        return self.target_collection
+
+    def publish_collection(self):
+        """Build the index on the new collection, then atomically point the alias at it."""
+        alias = self.config.collection_name
+        self.client.update_collection(
+            collection_name=self.target_collection,
+            optimizers_config=OptimizersConfigDiff(indexing_threshold=self.config.indexing_threshold)
+        )
+        self._wait_until_indexed()
+
+        operations = []
+        current = self._alias_target(alias)
+        if current is not None:
+            operations.append(DeleteAliasOperation(delete_alias=DeleteAlias(alias_name=alias)))
+        elif self.client.collection_exists(alias):
+            # One-time migration from the old layout, where `collection_name` was a real collection
+            print(f"⚠️ Replacing legacy collection '{alias}' with an alias")
+            self.client.delete_collection(alias)
+        operations.append(CreateAliasOperation(
+            create_alias=CreateAlias(collection_name=self.target_collection, alias_name=alias)
+        ))
+        self.client.update_collection_aliases(change_aliases_operations=operations)
+        print(f"🔀 Alias '{alias}' now points to {self.target_collection} (was {current})")
+
+        self._garbage_collect_versions()
+
+        if self.price_table is not None:
+            with metrics.span("price_table_build"):
+                matched = self.price_table.publish()
+            print(f"💰 Price comparison table: {matched} books sold by more than one store")
+            self.price_table = None
+        self.book_matcher.close()
+
+    def _alias_target(self, alias: str) -> Optional[str]:
+        for collection_alias in self.client.get_aliases().aliases:
+            if collection_alias.alias_name == alias:
+                return collection_alias.collection_name
+        return None
+
+    def _wait_until_indexed(self):
+        deadline = time.time() + self.config.index_ready_timeout
+        while time.time() < deadline:
+            if self.client.get_collection(self.target_collection).status == CollectionStatus.GREEN:
+                return
+            time.sleep(1)
+        print(f"⚠️ {self.target_collection} still optimizing after {self.config.index_ready_timeout}s, publishing anyway")
+
+    def _next_version_name(self) -> str:
+        """Return an unused `<collection_name>_<digits>` version name, ordered by creation time.
+
+        Microsecond timestamps, bumped past any existing name, so two reindexes in the same
+        second can never build into (and republish) the same collection.
+        """
+        stamp = time.time_ns() // 1000
+        while True:
+            seconds, micros = divmod(stamp, 1_000_000)
+            name = f"{self.config.collection_name}_{time.strftime('%Y%m%d%H%M%S', time.localtime(seconds))}{micros:06d}"
+            if not self.client.collection_exists(name):
+                return name
+            stamp += 1
+
+    def _garbage_collect_versions(self):
+        """Drop old versioned collections, keeping the newest `keep_collection_versions`."""
+        prefix = f"{self.config.collection_name}_"
+        versions = sorted(
+            (c.name for c in self.client.get_collections().collections
+             if c.name.startswith(prefix) and c.name[len(prefix):].isdigit()),
+            # Numeric order so older second-resolution names still sort before microsecond ones
+            key=lambda name: int(name[len(prefix):])
+        )
+        live = self._alias_target(self.config.collection_name)
+        for name in versions[:len(versions) - self.config.keep_collection_versions]:
+            if name != live:
+                self.client.delete_collection(name)
+                print(f"Deleted old collection version: {name}")
+
+    def iter_documents(self, store: str, books: Iterable[Dict]) -> Iterator[Dict]:
+        """Lazily normalize a store's feed into documents using its registered adapter.
+
+        The description/summary is kept once, as `text`, rather than copied into the metadata too.
+        """
+        return STORE_ADAPTERS[store].iter_documents(books)
 
     def prepare_documents(self, store_a_data: List[Dict], store_b_data: List[Dict]) -> List[Dict]:
         """Prepare documents for embedding with normalized schemas"""
-        documents = []
-        
-        # Process Store A data
-        for book in store_a_data:
-            doc = {
-                "id": str(uuid.uuid4()),
-                "text": book["description"],  # This will be embedded
-                "store": "store_a",
-                "metadata": {
-                    "title": book["title"],
-                    "author": book["author"],
-                    "price": book["price"],
-                    "publication_year": book["publication_year"],
-                    "isbn": book.get("isbn", ""),
-                    "book_id": book["book_id"],
-                    "genre": book["genre"].lower(),
-                    "rating": book["rating"],
-                    "description": book["description"]
-                }
-            }
-            documents.append(doc)
-        
-        # Process Store B data
-        for book in store_b_data:
-            doc = {
-                "id": str(uuid.uuid4()),
-                "text": book["summary"],  # This will be embedded
-                "store": "store_b", 
-                "metadata": {
-                    "title": book["book_name"],
-                    "author": book["writer"],
-                    "price": book["cost"],
-                    "publication_year": book.get("publication_year", 2020),
-                    "isbn": book.get("isbn", ""),
-                    "product_id": book["product_id"],
-                    "genre": [g.lower() for g in book["category"]],
-                    "reviews_count": book["reviews_count"],
-                    "summary": book["summary"],
-                    "publisher": book.get("publisher", ""),
-                    "stock": book["stock"]
-                }
-            }
-            documents.append(doc)
-            
-        return documents
-
-    def index_documents(self, documents: List[Dict]):
-        """Create embeddings and index documents in Qdrant"""
-        print(f"Creating embeddings for {len(documents)} documents...")
-        
-        texts = [doc["text"] for doc in documents]
-        embeddings = self.embedding_model.encode(texts, show_progress_bar=True)
-        
-        points = []
-        for i, (doc, embedding) in enumerate(zip(documents, embeddings)):
-            point = PointStruct(
-                id=doc["id"],
-                vector=embedding.tolist(),
-                payload={
-                    "store": doc["store"],
-                    "text": doc["text"],
-                    **doc["metadata"]
-                }
-            )
-            points.append(point)
-        
-        self.client.upsert(
-            collection_name=self.config.collection_name,
-            points=points
-        )
-        print(f"Indexed {len(points)} documents in Qdrant")
+        return list(chain(
+            self.iter_documents("store_a", store_a_data),
+            self.iter_documents("store_b", store_b_data)
+        ))
+
+    @staticmethod
+    def _feed_has_isbns(adapter: StoreAdapter, sample: int = 1000) -> bool:
+        """Whether the first `sample` records of a feed carry ISBNs (declaring the field isn't enough)."""
+        source = adapter.field_map.get("isbn")
+        return source is not None and any(record.get(source) for record in islice(iter_feeds(adapter.feed), sample))
+
+    def match_books(self, adapters: List[StoreAdapter]) -> int:
+        """Pre-pass over the feeds that carry ISBNs, so books without one can be matched by title and author."""
+        adapters = [adapter for adapter in adapters if self._feed_has_isbns(adapter)]
+        with metrics.span("book_matching"), \
+                ThreadPoolExecutor(max_workers=self.config.ingest_store_parallelism) as executor:
+            list(executor.map(
+                profiled(lambda adapter: self.book_matcher.scan(adapter.iter_documents(iter_feeds(adapter.feed)))),
+                adapters
+            ))
+        print(f"🔗 Learned {len(self.book_matcher)} ISBNs for cross-store matching "
+              f"from {', '.join(adapter.store for adapter in adapters) or 'no feeds'}")
+        return len(self.book_matcher)
+
+    def ingest_store(self, adapter: StoreAdapter) -> int:
+        """Run one store's read -> normalize -> embed -> upsert pipeline."""
+        print(f"📚 [{adapter.store}] Ingesting {adapter.feed}")
+        indexed = self.index_documents(adapter.iter_documents(iter_feeds(adapter.feed)), label=adapter.store)
+        print(f"✅ [{adapter.store}] Indexed {indexed} documents")
+        return indexed
+
+    def ingest_stores(self, adapters: List[StoreAdapter]) -> int:
+        """Ingest every store in parallel; embedding concurrency is capped globally."""
+        with ThreadPoolExecutor(max_workers=self.config.ingest_store_parallelism) as executor:
+            return sum(executor.map(profiled(self.ingest_store), adapters))
+
+    def index_documents(self, documents: Iterable[Dict], label: str = "all") -> int:
+        """Create embeddings and index documents in Qdrant, one batch at a time"""
+        indexed = 0
+        for batch in batched(documents, self.config.ingest_batch_size):
+            canonical_ids = self.book_matcher.canonical_ids([doc["metadata"] for doc in batch])
+            for doc, canonical_id in zip(batch, canonical_ids):
+                doc["metadata"]["canonical_id"] = canonical_id
+            texts = [doc["text"] for doc in batch]
+            with self._embedding_slots, metrics.span("ingest_embedding", store=label):
+                embeddings = self.embedding_model.encode(texts, batch_size=self.config.embedding_batch_size)
+
+            points = [
+                PointStruct(
+                    id=doc["id"],
+                    vector=embedding.tolist(),
+                    payload={
+                        "store": doc["store"],
+                        "text": doc["text"],
+                        **doc["metadata"]
+                    }
+                )
+                for doc, embedding in zip(batch, embeddings)
+            ]
+            with self._upsert_lock, metrics.span("ingest_upsert", store=label):
+                if self.config.shard_by_store:
+                    # Points must go to their store's shard key
+                    by_store: Dict[str, List[PointStruct]] = {}
+                    for point in points:
+                        by_store.setdefault(point.payload["store"], []).append(point)
+                    for store, store_points in by_store.items():
+                        self.client.upsert(
+                            collection_name=self.target_collection,
+                            points=store_points,
+                            shard_key_selector=store
+                        )
+                else:
+                    self.client.upsert(
+                        collection_name=self.target_collection,
+                        points=points
+                    )
+            if self.price_table is not None:
+                self.price_table.add_offers(batch)
+            indexed += len(points)
+            print(f"[{label}] Indexed {indexed} documents...")
+
+        return indexed
 
 def run_ingestion():
     """Main function to run the data ingestion process"""
-    config = Config()
+    config = get_default_config()
+    adapters = list(STORE_ADAPTERS.values())
+
+    print("📚 Locating bookstore feeds...")
+    try:
+        for adapter in adapters:
+            resolve_feed_paths(adapter.feed)
+    except FileNotFoundError as e:
+        print(f"❌ {e}. Please run the dataset generator first to create the feed files!")
+        return
+
     ingestion_system = DataIngestion(config)
     
     print("🚀 Starting data ingestion...")
     
     ingestion_system.setup_collection()
+    ingestion_system.match_books(adapters)
     
-    print("📚 Loading bookstore data...")
-    try:
-        with open('data/store_a_books.json', 'r') as f:
-            store_a_data = json.load(f)
-        with open('data/store_b_books.json', 'r') as f:
-            store_b_data = json.load(f)
-    except FileNotFoundError:
-        print("❌ Please run the dataset generator first to create the JSON files!")
-        return
-    
-    documents = ingestion_system.prepare_documents(store_a_data, store_b_data)
-    ingestion_system.index_documents(documents)
-    
+    # Each store's records stream from disk through normalization, embedding and upsert in batches
+    indexed = ingestion_system.ingest_stores(adapters)
+    ingestion_system.embedding_model.close()
+    print(f"Indexed {indexed} documents in Qdrant")
+    ingestion_system.publish_collection()
+
+    # Invalidate cached answers computed against the previous data
+    version = CollectionVersion(config.collection_version_path).bump(ingestion_system.target_collection)
+    print(f"🔖 Collection version: {version}")
+
     print("✅ Data ingestion complete!")
 
 if __name__ == "__main__":
-    run_ingestion()
+    profile_config = get_default_config()
+    with profile_block("ingestion", profile_config.profile_mode, profile_config.profile_dir):
+        run_ingestion()
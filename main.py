@@ -1,7 +1,14 @@
+import argparse
+from contextlib import nullcontext
 import pandas as pd
 import json
 from crewai import Agent, Task, Crew, Process
+from data_ingestion import get_default_config
+from tools.cache_tools import get_response_cache
 from tools.crew_tools import BookSearchTool, BookAnalyticsTool
+from tools.metrics_tools import metrics
+from tools.profiling_tools import PROFILE_MODES, profile_block
+from tools.traffic_tools import RequestLog
 
 # Instantiate the custom tools
 book_search_tool = BookSearchTool()
@@ -40,25 +47,43 @@ book_search_crew = Crew(
     # memory=True
 )
 
-if __name__ == '__main__':
-    queries = [
-        "show me the cheapest books in the thriller genre",
-        "what are the most popular horror books?", 
-        "compare the average price of books between stores",
-        "find me some books by Stephen King",
-        "find me a book about a stranded astronaut",
-        "what is the most popular genre in each bookstore?",
-        "which store has better prices for science fiction books?",
-        "find highly rated books under $15",
-        "compare Andy Weir book prices between stores",
-        "show me fantasy books with good reviews"
-    ]
+config = get_default_config()
+response_cache = get_response_cache(config)
+request_log = RequestLog(config.request_log_path) if config.request_log_path else None
+
+def ask(query: str, fresh_crew: bool = False) -> str:
+    """Run the crew for a query, reusing the cached final answer while the collection is unchanged."""
+    def kickoff() -> str:
+        # A fresh copy keeps concurrent callers (e.g. the HTTP service) from sharing task/agent state.
+        crew = book_search_crew.copy() if fresh_crew else book_search_crew
+        with metrics.span("crew_run"):
+            return str(crew.kickoff(inputs={'query': query}))
+
+    # Answers built on a tool error or degraded search (see `mark_degraded`) are returned but not cached
+    return response_cache.get_or_compute("ask", query, kickoff)
 
+DEMO_QUERIES = [
+    "show me the cheapest books in the thriller genre",
+    "what are the most popular horror books?", 
+    "compare the average price of books between stores",
+    "find me some books by Stephen King",
+    "find me a book about a stranded astronaut",
+    "what is the most popular genre in each bookstore?",
+    "which store has better prices for science fiction books?",
+    "find highly rated books under $15",
+    "compare Andy Weir book prices between stores",
+    "show me fantasy books with good reviews"
+]
+
+def run_batch(queries: list, profile: str = None) -> list:
+    """Run each query through the crew, optionally writing one profile per query."""
     all_results = []
 
     for query in queries:
         print(f"\n🚀 Kicking off the crew with query: '{query}'")
-        result = book_search_crew.kickoff(inputs={'query': query})
+        with profile_block(query, profile, config.profile_dir), \
+                (request_log.record("ask", query) if request_log else nullcontext()):
+            result = ask(query)
         
         # Save the query and the agent's final response.
         all_results.append({'query': query, 'response': result})
@@ -73,6 +98,25 @@ if __name__ == '__main__':
         print("\nFinal Result:")
         print(result)
 
+    return all_results
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Run the batch of demo queries through the crew.")
+    parser.add_argument("--profile", choices=PROFILE_MODES, default=config.profile_mode or None,
+                        help="Profile queries (default: $BOOKSTORE_PROFILE). Output goes to Config.profile_dir.")
+    parser.add_argument("--profile-scope", choices=["query", "batch"], default="query",
+                        help="Write one profile per query, or one for the whole batch.")
+    args = parser.parse_args()
+
+    if args.profile_scope == "batch":
+        with profile_block("batch", args.profile, config.profile_dir):
+            all_results = run_batch(DEMO_QUERIES)
+    else:
+        all_results = run_batch(DEMO_QUERIES, profile=args.profile)
+
+    print(f"\n📦 Response cache stats: {response_cache.stats()}")
+    print(f"📈 Stage latencies: {json.dumps(metrics.percentiles(), indent=2)}")
+
     # Save all results to a CSV file
     if all_results:
         df = pd.DataFrame(all_results)
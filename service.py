@@ -0,0 +1,165 @@
+import asyncio
+from contextlib import asynccontextmanager, nullcontext
+from typing import Literal, Optional
+
+import uvicorn
+from fastapi import FastAPI, HTTPException
+from fastapi.responses import PlainTextResponse
+from pydantic import BaseModel, Field
+
+from book_agent import get_shared_rag_system
+from data_ingestion import Config, get_default_config
+from tools.cache_tools import get_response_cache, normalize_query
+from tools.concurrency_tools import BoundedWorkQueue, QueueFullError, SingleFlight
+from tools.metrics_tools import enable_opentelemetry, metrics
+from tools.profiling_tools import profile_block, profiled
+from tools.traffic_tools import RequestLog, annotate_request
+
+config = get_default_config()
+
+
+ProfileMode = Optional[Literal["cprofile", "sample", "memory"]]
+
+
+class SearchRequest(BaseModel):
+    query: str = Field(description="The natural language query for searching books.")
+    limit: int = Field(default=10, ge=1, le=100)
+    profile: ProfileMode = Field(default=None, description="Profile this request (overrides BOOKSTORE_PROFILE).")
+
+
+class QueryRequest(BaseModel):
+    query: str = Field(description="The analytical or conversational query.")
+    profile: ProfileMode = Field(default=None, description="Profile this request (overrides BOOKSTORE_PROFILE).")
+
+
+class ServiceState:
+    """Warm objects shared by every request handled by this process."""
+
+    def __init__(self, config: Config):
+        self.config = config
+        self.rag_system = None
+        self.analytics_tool = None
+        self.response_cache = get_response_cache(config)
+        self.queue = BoundedWorkQueue(workers=config.service_workers, maxsize=config.service_queue_size)
+        self.single_flight = SingleFlight()
+        self.request_log = RequestLog(config.request_log_path) if config.request_log_path else None
+
+    def start(self):
+        # Imported lazily so the crew (and its tools) are built once, after the shared RAG system is warm.
+        from tools.crew_tools import BookAnalyticsTool
+
+        self.rag_system = get_shared_rag_system(self.config)
+        self.rag_system.bind_event_loop(asyncio.get_running_loop())
+        self.rag_system.warm_up()
+        self.analytics_tool = BookAnalyticsTool()
+        self.queue.start()
+
+    async def stop(self):
+        await self.queue.stop()
+        if self.request_log is not None:
+            self.request_log.close()
+
+    def record(self, route: str, query: str, **fields):
+        """Log the request to `Config.request_log_path`, if request logging is enabled."""
+        if self.request_log is None:
+            return nullcontext()
+        return self.request_log.record(route, query, **fields)
+
+
+state = ServiceState(config)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    print("🚀 Warming up models and clients...")
+    if config.opentelemetry:
+        enable_opentelemetry()
+    state.start()
+    if not state.rag_system.collection_exists():
+        print(f"⚠️ Collection '{config.collection_name}' not found. Please run data_ingestion.py first.")
+    print("✅ Service ready")
+    yield
+    await state.stop()
+
+
+app = FastAPI(title="Bookstore Search Service", lifespan=lifespan)
+
+
+async def _dispatch(route: str, query: str, fn, profile: Optional[str] = None):
+    """Coalesce identical in-flight requests, then run them through the bounded work queue.
+
+    Profiles cover the whole process while the request runs, so concurrent requests show up
+    in them too; "sample" mode is the most useful one under load.
+    """
+    try:
+        with profile_block(f"{route}-{query}", profile or config.profile_mode, config.profile_dir):
+            return await state.single_flight.do((route, normalize_query(query)), lambda: state.queue.submit(fn))
+    except QueueFullError as e:
+        metrics.increment("service_rejected_total", help="Requests shed because the work queue was full",
+                          route=route.split(":")[0])
+        annotate_request(status=503)
+        raise HTTPException(status_code=503, detail=str(e))
+
+
+def _run_crew(query: str) -> str:
+    from main import ask
+
+    return ask(query, fresh_crew=True)
+
+
+@app.post("/search")
+async def search(request: SearchRequest):
+    namespace = f"search:{request.limit}"
+    with state.record("search", request.query, limit=request.limit):
+        cached = state.response_cache.get(namespace, request.query)
+        if cached is not None:
+            return cached
+
+        results = await _dispatch(
+            namespace, request.query, lambda: state.rag_system.search(request.query, limit=request.limit),
+            profile=request.profile
+        )
+        state.response_cache.set(namespace, request.query, results)
+        return results
+
+
+@app.post("/analytics")
+async def analytics(request: QueryRequest):
+    with state.record("analytics", request.query):
+        result = await _dispatch(
+            "analytics", request.query,
+            lambda: asyncio.to_thread(profiled(state.analytics_tool._run), request.query),
+            profile=request.profile
+        )
+    return {"query": request.query, "result": result}
+
+
+@app.post("/ask")
+async def ask(request: QueryRequest):
+    with state.record("ask", request.query):
+        response = await _dispatch(
+            "ask", request.query, lambda: asyncio.to_thread(profiled(_run_crew), request.query), profile=request.profile
+        )
+    return {"query": request.query, "response": response}
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def prometheus_metrics():
+    return metrics.render_prometheus()
+
+
+@app.get("/health")
+async def health():
+    return {
+        "status": "ok",
+        "queue_depth": state.queue.depth(),
+        "in_flight": state.single_flight.in_flight(),
+        "coalesced": state.single_flight.coalesced,
+        "rejected": state.queue.rejected,
+        "cache": state.response_cache.stats(),
+        "latency": metrics.percentiles(),
+    }
+
+
+if __name__ == "__main__":
+    uvicorn.run(app, host=config.service_host, port=config.service_port)
@@ -1,10 +1,22 @@
+"""
+Synthetic bookstore catalog generator.
+
+Streams books for each store to JSON, JSONL or Parquet. Every book is derived
+from a deterministic seed (per catalog entry and per output shard), so the
+same arguments always produce the same data no matter how many worker
+processes are used.
+
+Usage:
+    python synthetic_data_generation.py                      # 50 books per store -> data/*.json
+    python synthetic_data_generation.py --books-per-store 10000000 --format parquet \
+        --out-dir data/large --workers 16 --overlap 0.4
+"""
+import argparse
 import json
+import os
 import random
-from datetime import datetime, timedelta
-import uuid
-
-# Seed for reproducibility
-random.seed(42)
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterator, List, Tuple
 
 # Common data for both stores (to enable comparisons)
 authors = [
@@ -258,211 +270,394 @@ books_data = [
     }
 ]
 
-def generate_store_a_data(num_books=50):
+# Vocabulary for generated books. Titles, authors and descriptions are composed
+# from these pools so large catalogs don't collapse into near-duplicate texts.
+first_names = [
+    "Amara", "Ben", "Chen", "Dana", "Elif", "Farid", "Greta", "Hiro", "Ines", "Jonah",
+    "Kemi", "Lars", "Maya", "Nikhil", "Olga", "Pedro", "Quinn", "Rosa", "Sami", "Tara",
+    "Umar", "Vera", "Wes", "Xin", "Yara", "Zane", "Aditi", "Bruno", "Clara", "Dmitri"
+]
+last_names = [
+    "Abara", "Brennan", "Castillo", "Dubois", "Eriksen", "Fujimoto", "Gallagher", "Haddad",
+    "Ivanova", "Jensen", "Kowalski", "Lindqvist", "Moreau", "Nakamura", "Okafor", "Petrov",
+    "Quintero", "Rahman", "Silva", "Takahashi", "Underwood", "Varga", "Whitfield", "Yilmaz", "Zhou"
+]
+title_adjectives = [
+    "Silent", "Broken", "Hidden", "Last", "Crimson", "Endless", "Forgotten", "Golden", "Hollow",
+    "Iron", "Lost", "Midnight", "Distant", "Burning", "Quiet", "Shattered", "Wandering", "Frozen"
+]
+title_nouns = [
+    "Harbor", "Kingdom", "Orbit", "Garden", "Signal", "Archive", "River", "Machine", "Empire",
+    "Lantern", "Mirror", "Frontier", "Covenant", "Labyrinth", "Tide", "Cipher", "Compass", "Crown"
+]
+places = [
+    "a drowned city", "a remote research station", "a generation ship", "a small coastal town",
+    "the Martian colonies", "a crumbling empire", "a Victorian boarding house", "the Arctic tundra",
+    "a near-future Lagos", "an underground library", "a desert monastery", "a floating market"
+]
+protagonists = [
+    "a disgraced detective", "a young cartographer", "an exiled princess", "a retired astronaut",
+    "a reluctant heir", "a botanist", "a street musician", "an AI companion", "a war widow",
+    "a teenage hacker", "a village healer", "a ship's engineer"
+]
+conflicts = [
+    "uncovers a conspiracy that reaches the highest levels of power",
+    "must outwit a rival who knows every secret",
+    "searches for a sibling who vanished years ago",
+    "races to stop a catastrophe no one else believes in",
+    "falls in love with someone on the opposite side of a war",
+    "inherits a debt that can only be paid in memories",
+    "is haunted by a voice that predicts the future",
+    "builds a business from nothing against impossible odds"
+]
+themes = [
+    "loyalty and betrayal", "grief and resilience", "power and its price", "identity and belonging",
+    "science and faith", "memory and forgetting", "ambition and consequence", "freedom and control"
+]
+publishers = ["Penguin", "Random House", "HarperCollins", "Simon & Schuster", "Macmillan"]
+
+STORES = ("store_a", "store_b")
+# Catalog indices for books only store B carries start here, so they never collide with store A's.
+STORE_B_ONLY_OFFSET = 10 ** 12
+
+
+def _make_text(rng: random.Random, genre: str, title: str) -> str:
+    # The phrase pools only give ~1.7M combinations, so large catalogs repeated descriptions (and,
+    # with the seeded encoder, vectors); the numbered title and a named lead keep every book distinct.
+    return (
+        f"{title}: in {rng.choice(places)}, {rng.choice(first_names)}, "
+        f"{rng.choice(protagonists)}, {rng.choice(conflicts)}. "
+        f"A {rng.choice(['gripping', 'tender', 'sweeping', 'darkly funny', 'haunting', 'propulsive'])} "
+        f"{genre.lower()} story about {rng.choice(themes)}."
+    )
+
+
+def _numbered_title(title: str, index: int) -> str:
+    # Large catalogs run out of distinct titles, so number them to keep title+author matching meaningful.
+    if index >= STORE_B_ONLY_OFFSET:
+        return f"{title} #B{index - STORE_B_ONLY_OFFSET}"
+    return f"{title} #{index}" if index >= 1000 else title
+
+
+def catalog_book(index: int, seed: int) -> Dict:
+    """Return the canonical book at `index`; identical for every store and worker that asks for it."""
+    if index < len(books_data):
+        book = dict(books_data[index])
+        book["list_price"] = round(random.Random(f"{seed}:price:{index}").uniform(8.99, 29.99), 2)
+        return book
+
+    rng = random.Random(f"{seed}:catalog:{index}")
+    genre_index = rng.randrange(len(genres_store_a))
+    genre = genres_store_a[genre_index]
+    if rng.random() < 0.3:
+        author = rng.choice(authors)
+    else:
+        author = f"{rng.choice(first_names)} {rng.choice(last_names)}"
+    title = _numbered_title(rng.choice([
+        f"The {rng.choice(title_adjectives)} {rng.choice(title_nouns)}",
+        f"{rng.choice(title_nouns)} of {rng.choice(title_nouns)}s",
+        f"The {rng.choice(title_nouns)} Beneath {rng.choice(places).split(' ', 1)[1].title()}",
+    ]), index)
+    return {
+        "title": title,
+        "author": author,
+        "genre": genre,
+        "categories": categories_store_b[genre_index],
+        "description": _make_text(rng, genre, title),
+        "summary": _make_text(rng, genre, title),
+        "isbn": f"978-{rng.randint(1000000000, 9999999999)}",
+        "publication_year": rng.randint(1950, 2023),
+        "publisher": rng.choice(publishers),
+        "list_price": round(rng.uniform(8.99, 29.99), 2)
+    }
+
+
+def store_a_book(index: int, rng: random.Random, seed: int) -> Dict:
+    book = catalog_book(index, seed)
+    return {
+        "book_id": f"BKA_{1000 + index}",
+        "title": book["title"],
+        "author": book["author"],
+        "genre": book["genre"],
+        "price": round(book["list_price"] * rng.uniform(0.9, 1.1), 2),
+        "rating": round(rng.uniform(3.0, 5.0), 1),
+        "description": book["description"],
+        "isbn": book["isbn"],
+        "publication_year": book["publication_year"]
+    }
+
+
+def store_b_book(index: int, rng: random.Random, seed: int, overlap: float) -> Dict:
+    # The predefined books are always shared; beyond those, `overlap` of store B's books are also in store A.
+    shared = index < len(books_data) or rng.random() < overlap
+    book = catalog_book(index if shared else STORE_B_ONLY_OFFSET + index, seed)
+
+    if rng.random() < 0.3:  # 30% chance of being cheaper than Store A
+        price_multiplier = rng.uniform(0.8, 0.95)
+    elif rng.random() < 0.2:  # 20% chance of being more expensive
+        price_multiplier = rng.uniform(1.05, 1.2)
+    else:
+        price_multiplier = rng.uniform(0.95, 1.05)
+
+    return {
+        "product_id": f"AMZN_{rng.randint(100000000, 999999999)}",
+        "book_name": book["title"],
+        "writer": book["author"],
+        "category": book["categories"],
+        "cost": round(book["list_price"] * price_multiplier, 2),
+        "reviews_count": rng.randint(10, 5000),
+        "summary": book["summary"],
+        "publisher": book.get("publisher", "Unknown Publisher"),
+        "stock": rng.randint(0, 100)
+    }
+
+
+def generate_books(store: str, start: int, stop: int, seed: int = 42, overlap: float = 0.3,
+                   shard: int = 0) -> Iterator[Dict]:
+    """Lazily yield the books with indices [start, stop) for `store`, seeded per shard."""
+    rng = random.Random(f"{seed}:{store}:{shard}")
+    for index in range(start, stop):
+        if store == "store_a":
+            yield store_a_book(index, rng, seed)
+        elif store == "store_b":
+            yield store_b_book(index, rng, seed, overlap)
+        else:
+            raise ValueError(f"Unknown store: {store}")
+
+
+def generate_store_a_data(num_books=50, seed=42):
     """Generate Store A dataset"""
-    store_a_books = []
-    
-    # Use all predefined books
-    for i, book in enumerate(books_data):
-        store_a_book = {
-            "book_id": f"BKA_{1000 + i}",
-            "title": book["title"],
-            "author": book["author"],
-            "genre": book["genre"],
-            "price": round(random.uniform(8.99, 29.99), 2),
-            "rating": round(random.uniform(3.0, 5.0), 1),
-            "description": book["description"],
-            "isbn": book["isbn"],
-            "publication_year": book["publication_year"]
-        }
-        store_a_books.append(store_a_book)
-    
-    # Generate additional books to reach num_books
-    for i in range(len(books_data), num_books):
-        store_a_book = {
-            "book_id": f"BKA_{1000 + i}",
-            "title": f"Book Title {i + 1}",
-            "author": random.choice(authors),
-            "genre": random.choice(genres_store_a),
-            "price": round(random.uniform(8.99, 29.99), 2),
-            "rating": round(random.uniform(3.0, 5.0), 1),
-            "description": f"An engaging {random.choice(genres_store_a).lower()} novel that explores themes of adventure, mystery, and human nature.",
-            "isbn": f"978-{random.randint(1000000000, 9999999999)}",
-            "publication_year": random.randint(1950, 2023)
-        }
-        store_a_books.append(store_a_book)
-    
-    return store_a_books
-
-def generate_store_b_data(num_books=50):
+    return list(generate_books("store_a", 0, num_books, seed=seed))
+
+
+def generate_store_b_data(num_books=50, seed=42, overlap=0.3):
     """Generate Store B dataset with some overlapping books but different schemas"""
-    store_b_books = []
-    
-    # Use predefined books with some price variations and different field names
-    for i, book in enumerate(books_data):
-        # Add some price variation and occasionally higher/lower prices
-        base_price = random.uniform(7.99, 31.99)
-        if random.random() < 0.3:  # 30% chance of being cheaper than Store A
-            price_multiplier = random.uniform(0.8, 0.95)
-        elif random.random() < 0.2:  # 20% chance of being more expensive
-            price_multiplier = random.uniform(1.05, 1.2)
-        else:
-            price_multiplier = random.uniform(0.95, 1.05)
-        
-        store_b_book = {
-            "product_id": f"AMZN_{random.randint(100000000, 999999999)}",
-            "book_name": book["title"],
-            "writer": book["author"],
-            "category": book["categories"],
-            "cost": round(base_price * price_multiplier, 2),
-            "reviews_count": random.randint(10, 5000),
-            "summary": book["summary"],
-            "publisher": book.get("publisher", "Unknown Publisher"),
-            "stock": random.randint(0, 100)
-        }
-        store_b_books.append(store_b_book)
-    
-    # Generate additional books
-    for i in range(len(books_data), num_books):
-        genre_pair = random.choice(categories_store_b)
-        store_b_book = {
-            "product_id": f"AMZN_{random.randint(100000000, 999999999)}",
-            "book_name": f"Book Title {i + 1}",
-            "writer": random.choice(authors),
-            "category": genre_pair,
-            "cost": round(random.uniform(7.99, 31.99), 2),
-            "reviews_count": random.randint(10, 5000),
-            "summary": f"A compelling {genre_pair[0].lower()} story that captivates readers with its unique perspective and engaging narrative.",
-            "publisher": random.choice(["Penguin", "Random House", "HarperCollins", "Simon & Schuster", "Macmillan"]),
-            "stock": random.randint(0, 100)
-        }
-        store_b_books.append(store_b_book)
-    
-    return store_b_books
-
-# Generate datasets
-print("Generating Store A dataset...")
-store_a_data = generate_store_a_data(50)
-
-print("Generating Store B dataset...")
-store_b_data = generate_store_b_data(50)
-
-# Save datasets
-with open('data/store_a_books.json', 'w', encoding='utf-8') as f:
-    json.dump(store_a_data, f, indent=2, ensure_ascii=False)
-
-with open('data/store_b_books.json', 'w', encoding='utf-8') as f:
-    json.dump(store_b_data, f, indent=2, ensure_ascii=False)
-
-print(f"\nDatasets generated successfully!")
-print(f"Store A: {len(store_a_data)} books")
-print(f"Store B: {len(store_b_data)} books")
-
-# Display sample data
-print("\n" + "="*50)
-print("STORE A SAMPLE:")
-print("="*50)
-for i in range(3):
-    book = store_a_data[i]
-    print(f"Book ID: {book['book_id']}")
-    print(f"Title: {book['title']}")
-    print(f"Author: {book['author']}")
-    print(f"Genre: {book['genre']}")
-    print(f"Price: ${book['price']}")
-    print(f"Rating: {book['rating']}/5.0")
-    print(f"Description: {book['description'][:100]}...")
-    print("-" * 30)
-
-print("\n" + "="*50)
-print("STORE B SAMPLE:")
-print("="*50)
-for i in range(3):
-    book = store_b_data[i]
-    print(f"Product ID: {book['product_id']}")
-    print(f"Book Name: {book['book_name']}")
-    print(f"Writer: {book['writer']}")
-    print(f"Category: {book['category']}")
-    print(f"Cost: ${book['cost']}")
-    print(f"Reviews Count: {book['reviews_count']}")
-    print(f"Summary: {book['summary'][:100]}...")
-    print(f"Stock: {book['stock']}")
-    print("-" * 30)
-
-# Generate analysis for query demonstrations
-print("\n" + "="*60)
-print("DATASET ANALYSIS FOR QUERY DEMONSTRATIONS")
-print("="*60)
-
-# 1. Genre popularity analysis
-store_a_genres = {}
-for book in store_a_data:
-    genre = book['genre']
-    store_a_genres[genre] = store_a_genres.get(genre, 0) + 1
-
-store_b_categories = {}
-for book in store_b_data:
-    for category in book['category']:
-        store_b_categories[category] = store_b_categories.get(category, 0) + 1
-
-print("\n1. GENRE POPULARITY:")
-print("Store A - Top 5 Genres:")
-for genre, count in sorted(store_a_genres.items(), key=lambda x: x[1], reverse=True)[:5]:
-    print(f"  {genre}: {count} books")
-
-print("\nStore B - Top 5 Categories:")
-for category, count in sorted(store_b_categories.items(), key=lambda x: x[1], reverse=True)[:5]:
-    print(f"  {category}: {count} books")
-
-# 2. Price comparison
-store_a_avg_price = sum(book['price'] for book in store_a_data) / len(store_a_data)
-store_b_avg_price = sum(book['cost'] for book in store_b_data) / len(store_b_data)
-
-print(f"\n2. PRICE COMPARISON:")
-print(f"Store A average price: ${store_a_avg_price:.2f}")
-print(f"Store B average price: ${store_b_avg_price:.2f}")
-print(f"Price difference: ${abs(store_a_avg_price - store_b_avg_price):.2f}")
-
-# 3. Common books for comparison
-common_titles = set()
-store_a_titles = {book['title']: book for book in store_a_data}
-store_b_titles = {book['book_name']: book for book in store_b_data}
-
-print(f"\n3. OVERLAPPING BOOKS FOR PRICE COMPARISON:")
-print("Title | Store A Price | Store B Price | Difference")
-print("-" * 60)
-for title in store_a_titles:
-    if title in store_b_titles:
-        a_price = store_a_titles[title]['price']
-        b_price = store_b_titles[title]['cost']
-        diff = b_price - a_price
-        print(f"{title[:25]:<25} | ${a_price:>6.2f} | ${b_price:>6.2f} | ${diff:>6.2f}")
-
-# 4. Sample queries for demonstration
-print(f"\n4. SAMPLE QUERIES TO DEMONSTRATE:")
-print("="*40)
-print("Query 1: 'Find me books about space exploration'")
-print("  - Should match: The Martian, Project Hail Mary, Dune")
-print("  - Tests: Semantic search across descriptions")
-
-print("\nQuery 2: 'What are the most popular genres in each store?'")
-print("  - Tests: Schema mapping (genre vs category) + aggregation")
-
-print("\nQuery 3: 'Which store has better prices for science fiction books?'")
-print("  - Tests: Cross-store comparison + genre filtering")
-
-print("\nQuery 4: 'Find highly rated books under $15'")
-print("  - Tests: Multi-criteria filtering across different schemas")
-
-print("\nQuery 5: 'Compare Andy Weir book prices between stores'")
-print("  - Tests: Author matching + price comparison")
-
-print(f"\n5. SCHEMA MAPPING CHALLENGES:")
-print("="*40)
-print("- title (A) ↔ book_name (B)")
-print("- author (A) ↔ writer (B)")
-print("- genre (A) ↔ category (B) [single string vs array]")
-print("- price (A) ↔ cost (B)")
-print("- rating (A) ↔ reviews_count (B) [different rating systems]")
-print("- description (A) ↔ summary (B)")
-
-print("\nDatasets are ready for RAG system testing!")
\ No newline at end of file
+    return list(generate_books("store_b", 0, num_books, seed=seed, overlap=overlap))
+
+
+def write_json(books: Iterator[Dict], path: str) -> int:
+    """Stream books into a single JSON array without holding them in memory."""
+    count = 0
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write("[\n")
+        for book in books:
+            if count:
+                f.write(",\n")
+            f.write(json.dumps(book, ensure_ascii=False))
+            count += 1
+        f.write("\n]\n")
+    return count
+
+
+def write_jsonl(books: Iterator[Dict], path: str) -> int:
+    count = 0
+    with open(path, 'w', encoding='utf-8') as f:
+        for book in books:
+            f.write(json.dumps(book, ensure_ascii=False) + "\n")
+            count += 1
+    return count
+
+
+def write_parquet(books: Iterator[Dict], path: str, row_group_size: int = 50_000) -> int:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    count = 0
+    writer = None
+    batch: List[Dict] = []
+    try:
+        for book in books:
+            batch.append(book)
+            if len(batch) >= row_group_size:
+                table = pa.Table.from_pylist(batch, schema=writer.schema if writer else None)
+                writer = writer or pq.ParquetWriter(path, table.schema)
+                writer.write_table(table)
+                count += len(batch)
+                batch = []
+        if batch:
+            table = pa.Table.from_pylist(batch, schema=writer.schema if writer else None)
+            writer = writer or pq.ParquetWriter(path, table.schema)
+            writer.write_table(table)
+            count += len(batch)
+    finally:
+        if writer is not None:
+            writer.close()
+    return count
+
+
+WRITERS = {"json": write_json, "jsonl": write_jsonl, "parquet": write_parquet}
+
+
+def write_shard(task: Tuple) -> Tuple[str, int]:
+    """Worker entry point: generate one shard of one store and write it to its own file."""
+    store, shard, start, stop, seed, overlap, fmt, path = task
+    return path, WRITERS[fmt](generate_books(store, start, stop, seed, overlap, shard), path)
+
+
+def plan_shards(stores: List[str], books_per_store: int, shard_size: int, seed: int, overlap: float,
+                fmt: str, out_dir: str) -> List[Tuple]:
+    if fmt == "json":
+        # A JSON array can't be split across files, so each store is a single shard.
+        return [
+            (store, 0, 0, books_per_store, seed, overlap, fmt, os.path.join(out_dir, f"{store}_books.json"))
+            for store in stores
+        ]
+    tasks = []
+    for store in stores:
+        for shard, start in enumerate(range(0, books_per_store, shard_size)):
+            stop = min(start + shard_size, books_per_store)
+            path = os.path.join(out_dir, f"{store}_books-{shard:05d}.{fmt}")
+            tasks.append((store, shard, start, stop, seed, overlap, fmt, path))
+    return tasks
+
+
+def generate_catalog(stores: List[str], books_per_store: int, fmt: str = "json", out_dir: str = "data",
+                     seed: int = 42, overlap: float = 0.3, shard_size: int = 100_000,
+                     workers: int = 1) -> List[Tuple[str, int]]:
+    """Generate every store's catalog, in parallel worker processes when `workers > 1`."""
+    os.makedirs(out_dir, exist_ok=True)
+    tasks = plan_shards(stores, books_per_store, shard_size, seed, overlap, fmt, out_dir)
+    if workers <= 1 or len(tasks) == 1:
+        return [write_shard(task) for task in tasks]
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(write_shard, tasks))
+
+
+def print_dataset_analysis(store_a_data: List[Dict], store_b_data: List[Dict]):
+    """Print sample records and the cross-store comparisons the demo queries rely on."""
+    print("\n" + "="*50)
+    print("STORE A SAMPLE:")
+    print("="*50)
+    for book in store_a_data[:3]:
+        print(f"Book ID: {book['book_id']}")
+        print(f"Title: {book['title']}")
+        print(f"Author: {book['author']}")
+        print(f"Genre: {book['genre']}")
+        print(f"Price: ${book['price']}")
+        print(f"Rating: {book['rating']}/5.0")
+        print(f"Description: {book['description'][:100]}...")
+        print("-" * 30)
+
+    print("\n" + "="*50)
+    print("STORE B SAMPLE:")
+    print("="*50)
+    for book in store_b_data[:3]:
+        print(f"Product ID: {book['product_id']}")
+        print(f"Book Name: {book['book_name']}")
+        print(f"Writer: {book['writer']}")
+        print(f"Category: {book['category']}")
+        print(f"Cost: ${book['cost']}")
+        print(f"Reviews Count: {book['reviews_count']}")
+        print(f"Summary: {book['summary'][:100]}...")
+        print(f"Stock: {book['stock']}")
+        print("-" * 30)
+
+    # Generate analysis for query demonstrations
+    print("\n" + "="*60)
+    print("DATASET ANALYSIS FOR QUERY DEMONSTRATIONS")
+    print("="*60)
+
+    # 1. Genre popularity analysis
+    store_a_genres = {}
+    for book in store_a_data:
+        genre = book['genre']
+        store_a_genres[genre] = store_a_genres.get(genre, 0) + 1
+
+    store_b_categories = {}
+    for book in store_b_data:
+        for category in book['category']:
+            store_b_categories[category] = store_b_categories.get(category, 0) + 1
+
+    print("\n1. GENRE POPULARITY:")
+    print("Store A - Top 5 Genres:")
+    for genre, count in sorted(store_a_genres.items(), key=lambda x: x[1], reverse=True)[:5]:
+        print(f"  {genre}: {count} books")
+
+    print("\nStore B - Top 5 Categories:")
+    for category, count in sorted(store_b_categories.items(), key=lambda x: x[1], reverse=True)[:5]:
+        print(f"  {category}: {count} books")
+
+    # 2. Price comparison
+    store_a_avg_price = sum(book['price'] for book in store_a_data) / len(store_a_data)
+    store_b_avg_price = sum(book['cost'] for book in store_b_data) / len(store_b_data)
+
+    print(f"\n2. PRICE COMPARISON:")
+    print(f"Store A average price: ${store_a_avg_price:.2f}")
+    print(f"Store B average price: ${store_b_avg_price:.2f}")
+    print(f"Price difference: ${abs(store_a_avg_price - store_b_avg_price):.2f}")
+
+    # 3. Common books for comparison
+    store_a_titles = {book['title']: book for book in store_a_data}
+    store_b_titles = {book['book_name']: book for book in store_b_data}
+
+    print(f"\n3. OVERLAPPING BOOKS FOR PRICE COMPARISON:")
+    print("Title | Store A Price | Store B Price | Difference")
+    print("-" * 60)
+    for title in store_a_titles:
+        if title in store_b_titles:
+            a_price = store_a_titles[title]['price']
+            b_price = store_b_titles[title]['cost']
+            diff = b_price - a_price
+            print(f"{title[:25]:<25} | ${a_price:>6.2f} | ${b_price:>6.2f} | ${diff:>6.2f}")
+
+    # 4. Sample queries for demonstration
+    print(f"\n4. SAMPLE QUERIES TO DEMONSTRATE:")
+    print("="*40)
+    print("Query 1: 'Find me books about space exploration'")
+    print("  - Should match: The Martian, Project Hail Mary, Dune")
+    print("  - Tests: Semantic search across descriptions")
+
+    print("\nQuery 2: 'What are the most popular genres in each store?'")
+    print("  - Tests: Schema mapping (genre vs category) + aggregation")
+
+    print("\nQuery 3: 'Which store has better prices for science fiction books?'")
+    print("  - Tests: Cross-store comparison + genre filtering")
+
+    print("\nQuery 4: 'Find highly rated books under $15'")
+    print("  - Tests: Multi-criteria filtering across different schemas")
+
+    print("\nQuery 5: 'Compare Andy Weir book prices between stores'")
+    print("  - Tests: Author matching + price comparison")
+
+    print(f"\n5. SCHEMA MAPPING CHALLENGES:")
+    print("="*40)
+    print("- title (A) ↔ book_name (B)")
+    print("- author (A) ↔ writer (B)")
+    print("- genre (A) ↔ category (B) [single string vs array]")
+    print("- price (A) ↔ cost (B)")
+    print("- rating (A) ↔ reviews_count (B) [different rating systems]")
+    print("- description (A) ↔ summary (B)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate synthetic bookstore catalogs.")
+    parser.add_argument("--books-per-store", type=int, default=50)
+    parser.add_argument("--stores", nargs="+", default=list(STORES), choices=STORES)
+    parser.add_argument("--format", default="json", choices=sorted(WRITERS))
+    parser.add_argument("--out-dir", default="data")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--overlap", type=float, default=0.3,
+                        help="Fraction of store B's generated books that store A also carries.")
+    parser.add_argument("--shard-size", type=int, default=100_000, help="Books per output file (jsonl/parquet).")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    print(f"Generating {args.books_per_store} books per store as {args.format} in {args.out_dir}/...")
+    written = generate_catalog(
+        args.stores, args.books_per_store, fmt=args.format, out_dir=args.out_dir, seed=args.seed,
+        overlap=args.overlap, shard_size=args.shard_size, workers=args.workers
+    )
+    print(f"\nDatasets generated successfully!")
+    for path, count in written:
+        print(f"{path}: {count} books")
+
+    # The sample/analysis report only makes sense for small demo catalogs.
+    if args.books_per_store <= 1000 and set(args.stores) == set(STORES):
+        print_dataset_analysis(
+            generate_store_a_data(args.books_per_store, seed=args.seed),
+            generate_store_b_data(args.books_per_store, seed=args.seed, overlap=args.overlap)
+        )
+
+
+if __name__ == "__main__":
+    main()
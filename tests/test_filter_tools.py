@@ -0,0 +1,62 @@
+import pytest
+
+from tools.filter_tools import parse_filters_locally
+
+
+def conditions(query: str) -> dict:
+    return {condition["key"]: condition for condition in parse_filters_locally(query)["must"]}
+
+
+def test_unrecognized_query_has_no_filters():
+    assert parse_filters_locally("a book about a stranded astronaut") == {"must": []}
+
+
+def test_author_keeps_original_casing():
+    assert conditions("find me some books by Stephen King")["author"]["match"] == {"value": "Stephen King"}
+
+
+@pytest.mark.parametrize("query, genre", [
+    ("show me the cheapest books in the thriller genre", "thriller"),
+    ("any good sci-fi?", "science fiction"),
+    ("literary fiction from the nineties", "literary fiction"),
+])
+def test_genre(query, genre):
+    assert conditions(query)["genre"]["match"] == {"value": genre}
+
+
+@pytest.mark.parametrize("query, price_range", [
+    ("books under $15", {"lte": 15.0}),
+    ("books over 30", {"gte": 30.0}),
+    ("books between $20 and 10", {"gte": 10.0, "lte": 20.0}),
+])
+def test_price_range(query, price_range):
+    assert conditions(query)["price"]["range"] == price_range
+
+
+@pytest.mark.parametrize("query, year_range", [
+    ("novels published after 2015 and before 2020", {"gt": 2015, "lt": 2020}),
+    ("novels published since 2015 and until 2020", {"gte": 2015, "lte": 2020}),
+    ("horror from 1990", {"gte": 1990}),
+])
+def test_publication_year_range(query, year_range):
+    assert conditions(query)["publication_year"]["range"] == year_range
+
+
+@pytest.mark.parametrize("query", ["show me the thrillers in store b", "thrillers from store_b"])
+def test_single_store(query):
+    assert conditions(query)["store"]["match"] == {"value": "store_b"}
+
+
+@pytest.mark.parametrize("query", [
+    "most popular genre in each store and why?",
+    "books about a store assistant",
+    "compare prices between store a and store b",
+])
+def test_no_store_unless_exactly_one_is_named(query):
+    assert "store" not in conditions(query)
+
+
+@pytest.mark.parametrize("query", ["fantasy books with good reviews", "highly rated horror"])
+def test_popularity_is_not_a_filter(query):
+    # Store A records `rating` and store B `reviews_count`; filtering on either drops the other store
+    assert set(conditions(query)) == {"genre"}
@@ -0,0 +1,284 @@
+import contextvars
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+from tools.metrics_tools import metrics
+from tools.traffic_tools import record_cache_lookup
+
+
+def normalize_query(query: str) -> str:
+    """Lowercase and collapse whitespace so trivially different phrasings share a cache entry."""
+    return " ".join(query.lower().split())
+
+
+class CollectionVersion:
+    """Reads the data version stamp that ingestion bumps after every (re)index."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._mtime: Optional[float] = None
+        self._version = "0"
+
+    def get(self) -> str:
+        try:
+            mtime = os.path.getmtime(self.path)
+        except OSError:
+            return "0"
+        if mtime != self._mtime:
+            with open(self.path, 'r') as f:
+                self._version = f.read().strip() or "0"
+            self._mtime = mtime
+        return self._version
+
+    def bump(self, version: Optional[str] = None) -> str:
+        version = version or f"{int(time.time())}-{uuid.uuid4().hex[:8]}"
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with open(self.path, 'w') as f:
+            f.write(version)
+        return version
+
+
+class LRUCacheBackend:
+    """In-process LRU storage, private to a single worker. Entries expire after `ttl` seconds (0 = never)."""
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            if key not in self._data:
+                return None
+            stored, value = self._data[key]
+            if self.ttl and time.time() - stored > self.ttl:
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: str):
+        with self._lock:
+            self._data[key] = (time.time(), value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+class QueryEmbeddingCache:
+    """LRU of query embeddings in front of an encoder.
+
+    User queries are heavy-tailed, so most repeats skip the model entirely.
+    Keys are the exact query text: the embedding depends on casing and
+    punctuation, unlike the normalized keys of the response cache.
+    """
+
+    def __init__(self, model, maxsize: int = 4096):
+        self.model = model
+        self.backend = LRUCacheBackend(maxsize=maxsize) if maxsize > 0 else None
+
+    def _record(self, outcome: str, count: int = 1):
+        if count:
+            metrics.increment("query_embedding_cache_requests_total", count,
+                              help="Query embedding cache lookups", outcome=outcome)
+
+    def encode(self, queries: Sequence[str], batch_size: int = 32) -> List[List[float]]:
+        """Embeddings for `queries` in order; only uncached queries go through the model."""
+        cached = [self.backend.get(query) for query in queries] if self.backend else [None] * len(queries)
+        missing = list(dict.fromkeys(query for query, vector in zip(queries, cached) if vector is None))
+        misses = sum(vector is None for vector in cached)
+        self._record("hits", len(queries) - misses)
+        self._record("misses", misses)
+        if missing:
+            encoded = dict(zip(missing, self.model.encode(missing, batch_size=batch_size).tolist()))
+            if self.backend:
+                for query, vector in encoded.items():
+                    self.backend.set(query, vector)
+            cached = [vector if vector is not None else encoded[query] for query, vector in zip(queries, cached)]
+        return cached
+
+    def encode_one(self, query: str) -> List[float]:
+        return self.encode([query])[0]
+
+    def warm_up(self, queries: Sequence[str], batch_size: int = 32) -> int:
+        """Run the model once (first-call initialization and allocations), then pre-encode `queries`."""
+        self.model.encode(["warm up"], batch_size=1)
+        if not queries or self.backend is None:
+            return 0
+        for query, vector in zip(queries, self.model.encode(list(queries), batch_size=batch_size).tolist()):
+            self.backend.set(query, vector)
+        return len(queries)
+
+
+class SQLiteCacheBackend:
+    """On-disk storage that can be shared between worker processes on the same host.
+
+    Entries expire `ttl` seconds after they were written (0 = never).
+    """
+
+    def __init__(self, path: str, maxsize: int = 100_000, ttl: float = 0):
+        self.path = path
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS response_cache "
+            "(key TEXT PRIMARY KEY, value TEXT NOT NULL, accessed REAL NOT NULL, created REAL NOT NULL)"
+        )
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(response_cache)")}
+        if "created" not in columns:
+            # Caches written before entries expired: treat their rows as already stale
+            self._conn.execute("ALTER TABLE response_cache ADD COLUMN created REAL NOT NULL DEFAULT 0")
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, created FROM response_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            now = time.time()
+            if self.ttl and now - row[1] > self.ttl:
+                self._conn.execute("DELETE FROM response_cache WHERE key = ?", (key,))
+                return None
+            self._conn.execute("UPDATE response_cache SET accessed = ? WHERE key = ?", (now, key))
+            return row[0]
+
+    def set(self, key: str, value: str):
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO response_cache (key, value, accessed, created) VALUES (?, ?, ?, ?)",
+                (key, value, now, now)
+            )
+            # Evict least recently used rows once we go over the size limit.
+            self._conn.execute(
+                "DELETE FROM response_cache WHERE key IN ("
+                "SELECT key FROM response_cache ORDER BY accessed DESC LIMIT -1 OFFSET ?)",
+                (self.maxsize,)
+            )
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM response_cache")
+
+
+# Reasons the result being computed inside the innermost `get_or_compute` is incomplete
+_degraded_reasons: contextvars.ContextVar[Optional[List[str]]] = contextvars.ContextVar("degraded_reasons", default=None)
+
+
+def mark_degraded(reason: str):
+    """Flag the result being computed as degraded so `get_or_compute` (and any caller up the stack) won't cache it.
+
+    Tools call this when they hand the agent an error or a degraded result: the
+    crew's final answer is built from it and must not be cached either.
+    """
+    reasons = _degraded_reasons.get()
+    if reasons is not None:
+        reasons.append(reason)
+
+
+class ResponseCache:
+    """Caches final answers and tool results keyed on the normalized query and collection version.
+
+    Only store complete answers: `get_or_compute` caches nothing when `compute`
+    raises or anything inside it calls `mark_degraded`, and `set` skips results
+    marked `degraded` (e.g. searches that ran with fallback filters), so these
+    are retried on the next request instead of being served until they expire.
+    """
+
+    def __init__(self, backend, version: CollectionVersion):
+        self.backend = backend
+        self.version = version
+        self._stats: Dict[str, Dict[str, int]] = {}
+        self._lock = threading.Lock()
+
+    def _record(self, namespace: str, outcome: str):
+        with self._lock:
+            counts = self._stats.setdefault(namespace, {"hits": 0, "misses": 0})
+            counts[outcome] += 1
+        metrics.increment("response_cache_requests_total", help="Response cache lookups",
+                          namespace=namespace, outcome=outcome)
+        record_cache_lookup(namespace, outcome)
+
+    def key(self, namespace: str, query: str) -> str:
+        return f"{namespace}|{self.version.get()}|{normalize_query(query)}"
+
+    def get(self, namespace: str, query: str) -> Optional[Any]:
+        if self.backend is None:
+            return None
+        cached = self.backend.get(self.key(namespace, query))
+        self._record(namespace, "hits" if cached is not None else "misses")
+        return json.loads(cached) if cached is not None else None
+
+    def set(self, namespace: str, query: str, value: Any):
+        if isinstance(value, dict) and value.get("degraded"):
+            mark_degraded(value["degraded"])
+            return
+        if self.backend is not None:
+            self.backend.set(self.key(namespace, query), json.dumps(value))
+
+    def get_or_compute(self, namespace: str, query: str, compute: Callable[[], Any]) -> Any:
+        cached = self.get(namespace, query)
+        if cached is not None:
+            return cached
+        reasons: List[str] = []
+        token = _degraded_reasons.set(reasons)
+        try:
+            value = compute()
+        finally:
+            _degraded_reasons.reset(token)
+        if reasons:
+            mark_degraded(reasons[0])
+            return value
+        self.set(namespace, query, value)
+        return value
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            return {
+                namespace: {
+                    **counts,
+                    "hit_rate": round(counts["hits"] / max(1, counts["hits"] + counts["misses"]), 4)
+                }
+                for namespace, counts in self._stats.items()
+            }
+
+
+def create_response_cache(config) -> ResponseCache:
+    """Build a ResponseCache from `Config.cache_backend` ('lru', 'sqlite' or 'none') and `cache_ttl`."""
+    if config.cache_backend == "sqlite":
+        backend = SQLiteCacheBackend(config.cache_path, maxsize=config.cache_size, ttl=config.cache_ttl)
+    elif config.cache_backend == "lru":
+        backend = LRUCacheBackend(maxsize=config.cache_size, ttl=config.cache_ttl)
+    elif config.cache_backend == "none":
+        backend = None
+    else:
+        raise ValueError(f"Unknown cache backend: {config.cache_backend}")
+    return ResponseCache(backend, CollectionVersion(config.collection_version_path))
+
+
+_shared_caches: Dict[str, ResponseCache] = {}
+_shared_caches_lock = threading.Lock()
+
+def get_response_cache(config) -> ResponseCache:
+    """Return the process-wide ResponseCache for this config."""
+    key = repr(config)
+    with _shared_caches_lock:
+        if key not in _shared_caches:
+            _shared_caches[key] = create_response_cache(config)
+        return _shared_caches[key]
@@ -0,0 +1,82 @@
+import asyncio
+import contextvars
+from typing import Any, Awaitable, Callable, Dict, Hashable, List
+
+from tools.traffic_tools import annotate_request
+
+
+class QueueFullError(Exception):
+    """Raised when the work queue is saturated and a request has to be shed."""
+
+
+class SingleFlight:
+    """Coalesces identical in-flight calls so only one of them does the work."""
+
+    def __init__(self):
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+        self.coalesced = 0
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """Run `fn` for `key`, or join the call already running for it."""
+        future = self._inflight.get(key)
+        if future is not None:
+            self.coalesced += 1
+            annotate_request(coalesced=True)
+            return await asyncio.shield(future)
+
+        future = asyncio.ensure_future(fn())
+        self._inflight[key] = future
+        future.add_done_callback(lambda _: self._inflight.pop(key, None))
+        # Shield so one caller disconnecting does not cancel the work for everyone else.
+        return await asyncio.shield(future)
+
+    def in_flight(self) -> int:
+        return len(self._inflight)
+
+
+class BoundedWorkQueue:
+    """Fixed pool of async workers fed by a bounded queue; rejects work when full."""
+
+    def __init__(self, workers: int, maxsize: int):
+        self.workers = workers
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+        self._tasks: List[asyncio.Task] = []
+        self.rejected = 0
+
+    def start(self):
+        for _ in range(self.workers):
+            self._tasks.append(asyncio.create_task(self._worker()))
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def submit(self, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """Enqueue `fn` and wait for its result; raises QueueFullError instead of waiting for a slot."""
+        future = asyncio.get_running_loop().create_future()
+        try:
+            # Keep the caller's context (request log entry, stage timings) for the work itself
+            self._queue.put_nowait((fn, future, contextvars.copy_context()))
+        except asyncio.QueueFull:
+            self.rejected += 1
+            raise QueueFullError("Work queue is full, try again later")
+        return await future
+
+    def depth(self) -> int:
+        return self._queue.qsize()
+
+    async def _worker(self):
+        while True:
+            fn, future, context = await self._queue.get()
+            try:
+                if not future.cancelled():
+                    future.set_result(await asyncio.create_task(context.run(fn), context=context))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                if not future.cancelled():
+                    future.set_exception(e)
+            finally:
+                self._queue.task_done()
@@ -1,4 +1,3 @@
-import asyncio
 import json
 from typing import Type, Any
 
@@ -6,8 +5,11 @@ from pydantic import BaseModel, Field, ConfigDict
 from crewai.tools import BaseTool
 
 import pandas as pd
-from book_agent import BookstoreRAGSystem
-from data_ingestion import Config
+from book_agent import BookstoreRAGSystem, get_shared_rag_system
+from data_ingestion import Config, get_default_config
+from tools.cache_tools import ResponseCache, get_response_cache, mark_degraded
+from tools.metrics_tools import metrics
+from tools.price_tools import PriceComparisonTable, compare_prices_json
 
 class BookSearchInput(BaseModel):
     """Input model for the BookSearchTool."""
@@ -23,22 +25,47 @@ class BookAnalyticsTool(BaseTool):
     description: str = "Performs data analysis on book data to answer analytical queries like 'most popular genre'."
     args_schema: Type[BaseModel] = BookAnalyticsInput
     rag_system: BookstoreRAGSystem = None
+    response_cache: ResponseCache = None
+    price_table: PriceComparisonTable = None
     last_result: str = None
 
-    def __init__(self, **kwargs: Any):
+    def __init__(self, config: Config = None, **kwargs: Any):
         super().__init__(**kwargs)
-        config = Config()
-        self.rag_system = BookstoreRAGSystem(config)
+        config = config or get_default_config()
+        self.rag_system = get_shared_rag_system(config)
+        self.response_cache = get_response_cache(config)
+        self.price_table = PriceComparisonTable(config.price_table_path)
         self.last_result = None
 
     def _run(self, query: str) -> str:
+        """Answer the analytical query, reusing the cached result while the collection is unchanged."""
+        with metrics.span("analytics"):
+            try:
+                result = self.response_cache.get_or_compute("analytics", query, lambda: self._analyze(query))
+            except Exception as e:
+                # Not cached, nor is the crew answer built on it: the next call retries
+                print(f"Error during analytics: {e}")
+                mark_degraded("analytics_error")
+                result = json.dumps({"error": f"Could not retrieve books to analyze: {e}"})
+        self.last_result = result
+        return result
+
+    def _analyze(self, query: str) -> str:
         """Use the RAG system to fetch all books and analyze them based on the query."""
+        lowered = query.lower()
+        is_cheapest_by_genre = "cheapest" in lowered and "genre" in lowered
+        if (not is_cheapest_by_genre and self.price_table.available()
+                and any(keyword in lowered for keyword in ["price", "cheaper", "compare"])):
+            # Cross-store comparisons are indexed lookups in the precomputed table, not a full scan
+            with metrics.span("analytics_price_comparison"):
+                return compare_prices_json(self.price_table, query)
+
         all_books = self.rag_system.get_all_books()
         if not all_books:
-            self.last_result = json.dumps({"error": "Could not retrieve any books to analyze."})
-            return self.last_result
+            raise ValueError("the collection is empty")
 
-        df = pd.DataFrame([book.payload for book in all_books])
+        with metrics.span("analytics_dataframe", rows=len(all_books)):
+            df = pd.DataFrame([book.payload for book in all_books])
         print(f"df: {df}")
         
         # More specific routing for complex queries
@@ -58,9 +85,9 @@ class BookAnalyticsTool(BaseTool):
         else:
             result = self._analyze_popular_genres(df)
         
-        self.last_result = result
         return result
 
+    @metrics.timed("analytics_cheapest_by_genre")
     def _analyze_cheapest_by_genre(self, df: pd.DataFrame, genre: str) -> str:
         """Finds the cheapest books in a specific genre."""
         if 'genre' not in df.columns or 'price' not in df.columns:
@@ -76,6 +103,7 @@ class BookAnalyticsTool(BaseTool):
         cheapest_books = genre_books.sort_values(by='price', ascending=True).head(5)
         return cheapest_books.to_json(orient='records')
 
+    @metrics.timed("analytics_prices")
     def _analyze_prices(self, df: pd.DataFrame) -> str:
         """Analyzes the average price of books per store."""
         if 'price' not in df.columns or 'store' not in df.columns:
@@ -86,6 +114,7 @@ class BookAnalyticsTool(BaseTool):
         
         return avg_prices.to_json(orient='records')
 
+    @metrics.timed("analytics_popular_genres")
     def _analyze_popular_genres(self, df: pd.DataFrame) -> str:
         """Analyzes the most popular genre per store."""
         if 'genre' not in df.columns or 'store' not in df.columns:
@@ -109,18 +138,26 @@ class BookSearchTool(BaseTool):
     description: str = "Searches for books in a vector database based on a user's query. It can handle natural language queries with filters."
     args_schema: Type[BaseModel] = BookSearchInput
     rag_system: BookstoreRAGSystem = None
+    response_cache: ResponseCache = None
     last_result: str = None
 
-    def __init__(self, **kwargs: Any):
+    def __init__(self, config: Config = None, **kwargs: Any):
         super().__init__(**kwargs)
-        config = Config()
-        self.rag_system = BookstoreRAGSystem(config)
+        config = config or get_default_config()
+        self.rag_system = get_shared_rag_system(config)
+        self.response_cache = get_response_cache(config)
         self.last_result = None
 
     def _run(self, query: str) -> str:
         """Use the RAG system to search for books."""
         # CrewAI's _run method is synchronous, so we run the async search method from our RAG system.
-        results = asyncio.run(self.rag_system.search(query))
-        json_results = json.dumps(results, indent=2)
+        try:
+            results = self.response_cache.get_or_compute("search", query, lambda: self.rag_system.search_sync(query))
+            json_results = json.dumps(results, indent=2)
+        except Exception as e:
+            # Not cached, nor is the crew answer built on it: the next call retries
+            print(f"Error during book search: {e}")
+            mark_degraded("search_error")
+            json_results = json.dumps({"error": f"Book search failed: {e}"})
         self.last_result = json_results
         return json_results
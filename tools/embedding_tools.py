@@ -0,0 +1,139 @@
+import hashlib
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from typing import List, Optional, Sequence
+
+import numpy as np
+
+# Model loaded once per worker process by `_init_worker`
+_worker_model = None
+
+
+def _set_torch_threads(threads: int):
+    if threads > 0:
+        import torch
+
+        torch.set_num_threads(threads)
+
+
+def _init_worker(model_name: str, threads: int):
+    global _worker_model
+    _set_torch_threads(threads)
+    _worker_model = load_embedding_model(model_name)
+
+
+def _worker_dimension() -> int:
+    return _worker_model.get_sentence_embedding_dimension()
+
+
+def _encode_into(shm_name: str, shape: tuple, start: int, texts: List[str], batch_size: int) -> int:
+    """Encode `texts` and write them into rows [start, start + len(texts)) of the shared output buffer."""
+    embeddings = _worker_model.encode(texts, batch_size=batch_size, convert_to_numpy=True)
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        output = np.ndarray(shape, dtype=np.float32, buffer=shm.buf)
+        output[start:start + len(texts)] = embeddings
+    finally:
+        shm.close()
+    return len(texts)
+
+
+class RandomEncoder:
+    """Offline stand-in for a SentenceTransformer: a seeded random unit vector per distinct text.
+
+    Selected with `embedding_model="random:<dim>"`. Deterministic across runs
+    and processes, so benchmarks and tests don't need model downloads.
+    """
+
+    def __init__(self, dimension: int):
+        self.dimension = dimension
+
+    def get_sentence_embedding_dimension(self) -> int:
+        return self.dimension
+
+    def encode(self, texts: Sequence[str], batch_size: int = 32, **kwargs) -> np.ndarray:
+        if isinstance(texts, str):
+            texts = [texts]
+        output = np.empty((len(texts), self.dimension), dtype=np.float32)
+        for i, text in enumerate(texts):
+            seed = int.from_bytes(hashlib.blake2b(text.encode(), digest_size=8).digest(), "little")
+            vector = np.random.default_rng(seed).standard_normal(self.dimension, dtype=np.float32)
+            output[i] = vector / np.linalg.norm(vector)
+        return output
+
+
+def load_embedding_model(model_name: str):
+    """Load a SentenceTransformer, or a RandomEncoder for "random:<dim>"."""
+    if model_name.startswith("random:"):
+        return RandomEncoder(int(model_name.split(":", 1)[1]))
+    from sentence_transformers import SentenceTransformer
+
+    return SentenceTransformer(model_name)
+
+
+class EmbeddingEngine:
+    """Encodes texts with a SentenceTransformer, in-process or across a pool of worker processes.
+
+    With `workers > 1` each worker process loads its own copy of the model and
+    runs `threads_per_worker` intra-op threads; results are written straight
+    into a shared-memory buffer instead of being pickled back to the parent.
+    """
+
+    def __init__(self, model_name: str, workers: int = 1, threads_per_worker: int = 0,
+                 chunk_size: int = 256):
+        self.model_name = model_name
+        self.workers = workers
+        self.chunk_size = chunk_size
+        self._model = None
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._dimension: Optional[int] = None
+
+        if workers > 1:
+            # spawn, not fork: forking a process that already initialized torch threads can deadlock
+            self._pool = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+                initargs=(model_name, threads_per_worker)
+            )
+        else:
+            _set_torch_threads(threads_per_worker)
+            self._model = load_embedding_model(model_name)
+
+    def get_sentence_embedding_dimension(self) -> int:
+        if self._dimension is None:
+            if self._model is not None:
+                self._dimension = self._model.get_sentence_embedding_dimension()
+            else:
+                self._dimension = self._pool.submit(_worker_dimension).result()
+        return self._dimension
+
+    def encode(self, texts: Sequence[str], batch_size: int = 32, **kwargs) -> np.ndarray:
+        if self._pool is None:
+            return self._model.encode(list(texts), batch_size=batch_size, convert_to_numpy=True, **kwargs)
+
+        texts = list(texts)
+        shape = (len(texts), self.get_sentence_embedding_dimension())
+        if not texts:
+            return np.empty(shape, dtype=np.float32)
+
+        shm = shared_memory.SharedMemory(create=True, size=int(np.prod(shape)) * 4)
+        try:
+            # Smaller chunks than len/workers keep every worker busy when chunks take uneven time
+            chunk_size = max(1, min(self.chunk_size, -(-len(texts) // self.workers)))
+            futures = [
+                self._pool.submit(_encode_into, shm.name, shape, start, texts[start:start + chunk_size], batch_size)
+                for start in range(0, len(texts), chunk_size)
+            ]
+            for future in futures:
+                future.result()
+            return np.ndarray(shape, dtype=np.float32, buffer=shm.buf).copy()
+        finally:
+            shm.close()
+            shm.unlink()
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
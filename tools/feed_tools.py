@@ -0,0 +1,61 @@
+import glob
+import json
+import os
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List
+
+
+def iter_feed(path: str) -> Iterator[Dict]:
+    """Yield records from a JSON array, JSONL or Parquet feed one at a time.
+
+    JSON arrays are parsed incrementally with ijson so the whole feed is never
+    materialized; JSONL and Parquet are read line by line / batch by batch.
+    """
+    extension = os.path.splitext(path)[1].lower()
+    if extension in (".jsonl", ".ndjson"):
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+    elif extension == ".json":
+        try:
+            import ijson
+        except ImportError:
+            print(f"⚠️ ijson not installed, loading {path} into memory")
+            with open(path, 'r', encoding='utf-8') as f:
+                yield from json.load(f)
+            return
+        with open(path, 'rb') as f:
+            # use_float keeps prices as floats instead of Decimal
+            yield from ijson.items(f, "item", use_float=True)
+    elif extension == ".parquet":
+        import pyarrow.parquet as pq
+
+        for batch in pq.ParquetFile(path).iter_batches():
+            yield from batch.to_pylist()
+    else:
+        raise ValueError(f"Unsupported feed format: {path}")
+
+
+def resolve_feed_paths(pattern: str) -> List[str]:
+    """Expand a feed path or glob (e.g. 'data/large/store_a_books-*.jsonl') into sorted file paths."""
+    paths = sorted(glob.glob(pattern))
+    if not paths:
+        raise FileNotFoundError(f"No feed files match: {pattern}")
+    return paths
+
+
+def iter_feeds(pattern: str) -> Iterator[Dict]:
+    """Yield records from every feed file matching `pattern`, in file order."""
+    for path in resolve_feed_paths(pattern):
+        yield from iter_feed(path)
+
+
+def batched(items: Iterable, size: int) -> Iterator[List]:
+    """Group an iterable into lists of at most `size` items."""
+    iterator = iter(items)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
@@ -0,0 +1,78 @@
+import re
+from typing import Dict, List
+
+from tools.store_adapters import STORE_ADAPTERS
+
+# Genres as stored in the payload (lowercased at ingestion); longest first so
+# "science fiction" wins over "fiction"
+KNOWN_GENRES = sorted([
+    "fiction", "science fiction", "fantasy", "mystery", "romance", "thriller", "horror",
+    "biography", "history", "philosophy", "self-help", "business", "technology", "art", "travel",
+    "literary fiction", "hard sf", "epic fantasy", "crime fiction", "contemporary romance", "suspense",
+    "supernatural", "memoir", "world history", "ethics", "personal development", "entrepreneurship",
+    "programming", "visual arts", "adventure"
+], key=len, reverse=True)
+GENRE_ALIASES = {"sci-fi": "science fiction", "scifi": "science fiction", "self help": "self-help"}
+
+_PRICE = r"\$?(\d+(?:\.\d+)?)"
+_PRICE_BETWEEN = re.compile(rf"between\s+{_PRICE}\s+and\s+{_PRICE}")
+_PRICE_MAX = re.compile(rf"(?:under|below|less than|cheaper than|at most|up to|max(?:imum)?)\s+{_PRICE}")
+_PRICE_MIN = re.compile(rf"(?:over|above|more than|at least|min(?:imum)?)\s+{_PRICE}")
+_YEAR_BOUND = re.compile(r"\b(after|since|from|before|until|prior to)\s+((?:19|20)\d\d)")
+# "after"/"before" exclude the year itself, "since"/"from"/"until" include it
+_YEAR_OPERATORS = {"after": "gt", "since": "gte", "from": "gte", "before": "lt", "prior to": "lt", "until": "lte"}
+_AUTHOR = re.compile(r"\bby\s+([A-Z][\w.'-]*(?:\s+[A-Z][\w.'-]*)+)")
+
+
+def parse_filters_locally(user_query: str) -> Dict:
+    """Rule-based stand-in for LLM filter generation, used when the LLM misses its deadline.
+
+    Recognizes genres, "by <Author Name>", price and publication-year bounds
+    and a single store name. It returns the same {"must": [...]} shape as the
+    LLM. It only emits filters it is confident about, so an unrecognized query
+    degrades to an unfiltered vector search. Popularity phrases are left to
+    the vector ranking: the stores record it in different fields (rating vs.
+    reviews_count), and a `must` condition on either one drops the other store.
+    """
+    text = user_query.lower()
+    conditions: List[Dict] = []
+
+    author = _AUTHOR.search(user_query)
+    if author:
+        conditions.append({"key": "author", "match": {"value": author.group(1)}})
+        text = text.replace(author.group(0).lower(), " ")
+
+    for alias, genre in GENRE_ALIASES.items():
+        text = text.replace(alias, genre)
+    for genre in KNOWN_GENRES:
+        if re.search(rf"\b{re.escape(genre)}\b", text):
+            conditions.append({"key": "genre", "match": {"value": genre}})
+            break
+
+    between = _PRICE_BETWEEN.search(text)
+    price_max, price_min = _PRICE_MAX.search(text), _PRICE_MIN.search(text)
+    if between:
+        low, high = sorted(float(v) for v in between.groups())
+        conditions.append({"key": "price", "range": {"gte": low, "lte": high}})
+    elif price_max or price_min:
+        price_range = {}
+        if price_min:
+            price_range["gte"] = float(price_min.group(1))
+        if price_max:
+            price_range["lte"] = float(price_max.group(1))
+        conditions.append({"key": "price", "range": price_range})
+
+    year_range = {_YEAR_OPERATORS[word]: int(year) for word, year in _YEAR_BOUND.findall(text)}
+    if year_range:
+        conditions.append({"key": "publication_year", "range": year_range})
+
+    # "store_a" also matches "store a", but not "store and" or "store assistant"; several
+    # stores ("compare store a and store b") means no store filter at all
+    stores = [
+        store for store in STORE_ADAPTERS
+        if re.search(rf"\b{re.escape(store).replace('_', '[ _]')}\b", text)
+    ]
+    if len(stores) == 1:
+        conditions.append({"key": "store", "match": {"value": stores[0]}})
+
+    return {"must": conditions}
@@ -0,0 +1,105 @@
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+from typing import Dict, Iterable, List, Optional
+
+from tools.feed_tools import batched
+
+_NON_ALNUM = re.compile(r"[^0-9a-z]+")
+
+
+def normalize_text(value) -> str:
+    """Lowercase, drop punctuation and collapse whitespace: "The Martian!" -> "the martian"."""
+    return _NON_ALNUM.sub(" ", str(value or "").lower()).strip()
+
+
+def normalize_isbn(value) -> str:
+    """Digits (and a trailing X) only, so "978-0553418026" and "9780553418026" compare equal."""
+    return re.sub(r"[^0-9X]", "", str(value or "").upper())
+
+
+def title_author_key(title, author) -> bytes:
+    return hashlib.blake2b(f"{normalize_text(title)}|{normalize_text(author)}".encode(), digest_size=8).digest()
+
+
+class BookMatcher:
+    """Assigns every book a canonical ID shared by all stores that sell it.
+
+    Books are matched by ISBN. A record without one is matched by normalized
+    title and author against the ISBNs other stores provide, so `scan`
+    every store's documents before asking for IDs. Unmatched books get an ID
+    derived from title and author.
+
+    The title/author -> ISBN index lives in an on-disk SQLite file at `path`,
+    so memory stays flat however large the catalog is. `close` removes it.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            if os.path.exists(self.path):
+                os.remove(self.path)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=OFF")
+            self._conn.execute("PRAGMA synchronous=OFF")
+            self._conn.execute("CREATE TABLE isbn_by_title (key BLOB PRIMARY KEY, isbn TEXT NOT NULL) WITHOUT ROWID")
+        return self._conn
+
+    def scan(self, documents: Iterable[Dict], batch_size: int = 10_000) -> int:
+        """Learn the title/author -> ISBN pairs in `documents`; returns how many records had an ISBN."""
+        seen = 0
+        for batch in batched(documents, batch_size):
+            learned = []
+            for doc in batch:
+                metadata = doc["metadata"]
+                isbn = normalize_isbn(metadata.get("isbn"))
+                if isbn:
+                    learned.append((title_author_key(metadata.get("title"), metadata.get("author")), isbn))
+            with self._lock:
+                self._connection().executemany("INSERT OR IGNORE INTO isbn_by_title VALUES (?, ?)", learned)
+            seen += len(learned)
+        return seen
+
+    def canonical_ids(self, metadatas: List[Dict]) -> List[str]:
+        """Canonical IDs for a batch of documents' metadata, in order."""
+        isbns = [normalize_isbn(metadata.get("isbn")) for metadata in metadatas]
+        keys = {
+            i: title_author_key(metadata.get("title"), metadata.get("author"))
+            for i, (metadata, isbn) in enumerate(zip(metadatas, isbns)) if not isbn
+        }
+        found: Dict[bytes, str] = {}
+        lookups = list(set(keys.values()))
+        with self._lock:
+            if self._conn is not None:
+                # Stay under SQLite's limit on query parameters
+                for start in range(0, len(lookups), 500):
+                    chunk = lookups[start:start + 500]
+                    found.update(self._conn.execute(
+                        f"SELECT key, isbn FROM isbn_by_title WHERE key IN ({','.join('?' * len(chunk))})", chunk
+                    ).fetchall())
+        ids = []
+        for i, isbn in enumerate(isbns):
+            if not isbn:
+                isbn = found.get(keys[i])
+            ids.append(f"isbn:{isbn}" if isbn else f"ta:{keys[i].hex()}")
+        return ids
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+                os.remove(self.path)
+
+    def __len__(self) -> int:
+        with self._lock:
+            if self._conn is None:
+                return 0
+            return self._conn.execute("SELECT COUNT(*) FROM isbn_by_title").fetchone()[0]
@@ -0,0 +1,199 @@
+import functools
+import json
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, List, Optional, Tuple
+
+QUANTILES = (0.5, 0.95, 0.99)
+
+# Per-request stage timings, collected when a caller opens `collect_timings()`
+_request_timings: ContextVar[Optional[Dict[str, float]]] = ContextVar("request_timings", default=None)
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def _label_key(labels: Dict[str, str]) -> LabelKey:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _format_labels(key: LabelKey, extra: Dict[str, str] = None) -> str:
+    pairs = list(key) + list((extra or {}).items())
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in pairs) + "}"
+
+
+class Histogram:
+    """Latency distribution: total count/sum plus a window of recent samples for percentiles."""
+
+    def __init__(self, window: int = 4096):
+        self.count = 0
+        self.sum = 0.0
+        self._samples = deque(maxlen=window)
+
+    def observe(self, value: float):
+        self.count += 1
+        self.sum += value
+        self._samples.append(value)
+
+    def quantile(self, q: float) -> float:
+        if not self._samples:
+            return 0.0
+        ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))]
+
+
+class MetricsRegistry:
+    """Process-wide counters and histograms, exportable as Prometheus text."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: Dict[str, Dict[LabelKey, float]] = {}
+        self._histograms: Dict[str, Dict[LabelKey, Histogram]] = {}
+        self._help: Dict[str, str] = {}
+        self.timing_logs = True
+        self.span_exporters: List[Callable[[Dict], None]] = []
+
+    def configure(self, timing_logs: Optional[bool] = None):
+        if timing_logs is not None:
+            self.timing_logs = timing_logs
+
+    def increment(self, name: str, value: float = 1, help: str = "", **labels):
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            key = _label_key(labels)
+            series[key] = series.get(key, 0) + value
+            if help:
+                self._help.setdefault(name, help)
+
+    def observe(self, name: str, value: float, help: str = "", **labels):
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            series.setdefault(_label_key(labels), Histogram()).observe(value)
+            if help:
+                self._help.setdefault(name, help)
+
+    @contextmanager
+    def span(self, stage: str, **attributes):
+        """Time a pipeline stage, recording it in `stage_duration_seconds{stage=...}`."""
+        start_wall = time.time()
+        start = time.perf_counter()
+        error = None
+        try:
+            yield
+        except Exception as e:
+            error = type(e).__name__
+            raise
+        finally:
+            duration = time.perf_counter() - start
+            self.observe("stage_duration_seconds", duration, help="Duration of pipeline stages", stage=stage)
+            timings = _request_timings.get()
+            if timings is not None:
+                timings[stage] = round(timings.get(stage, 0.0) + duration, 6)
+            if self.timing_logs:
+                print(f"⏱️ {stage} took: {duration:.2f} seconds")
+            if self.span_exporters:
+                record = {"name": stage, "start": start_wall, "duration": duration,
+                          "error": error, "attributes": attributes}
+                for exporter in self.span_exporters:
+                    exporter(record)
+
+    def timed(self, stage: str):
+        """Decorator form of `span` for synchronous functions."""
+        def decorator(fn):
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                with self.span(stage):
+                    return fn(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def percentiles(self, name: str = "stage_duration_seconds") -> Dict[str, Dict[str, float]]:
+        """p50/p95/p99 per label set, e.g. {'stage=qdrant_search': {'p50': ..., ...}}."""
+        with self._lock:
+            return {
+                ",".join(f"{k}={v}" for k, v in key): {
+                    "count": histogram.count,
+                    **{f"p{int(q * 100)}": round(histogram.quantile(q), 6) for q in QUANTILES}
+                }
+                for key, histogram in self._histograms.get(name, {}).items()
+            }
+
+    def counters(self, name: str) -> Dict[str, float]:
+        with self._lock:
+            return {",".join(f"{k}={v}" for k, v in key): value
+                    for key, value in self._counters.get(name, {}).items()}
+
+    def render_prometheus(self) -> str:
+        """Render all metrics in the Prometheus text exposition format (histograms as summaries)."""
+        lines = []
+        with self._lock:
+            for name, series in sorted(self._counters.items()):
+                if name in self._help:
+                    lines.append(f"# HELP {name} {self._help[name]}")
+                lines.append(f"# TYPE {name} counter")
+                for key, value in series.items():
+                    lines.append(f"{name}{_format_labels(key)} {value}")
+            for name, series in sorted(self._histograms.items()):
+                if name in self._help:
+                    lines.append(f"# HELP {name} {self._help[name]}")
+                lines.append(f"# TYPE {name} summary")
+                for key, histogram in series.items():
+                    for q in QUANTILES:
+                        lines.append(f"{name}{_format_labels(key, {'quantile': str(q)})} {histogram.quantile(q)}")
+                    lines.append(f"{name}_sum{_format_labels(key)} {histogram.sum}")
+                    lines.append(f"{name}_count{_format_labels(key)} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+
+metrics = MetricsRegistry()
+
+
+@contextmanager
+def collect_timings():
+    """Collect the stage timings of everything run inside this block (per thread/task)."""
+    timings: Dict[str, float] = {}
+    token = _request_timings.set(timings)
+    try:
+        yield timings
+    finally:
+        _request_timings.reset(token)
+
+
+def json_lines_exporter(path: str) -> Callable[[Dict], None]:
+    """Span exporter that appends each span as a JSON line, for offline analysis."""
+    lock = threading.Lock()
+
+    def export(record: Dict):
+        with lock, open(path, 'a') as f:
+            f.write(json.dumps(record) + "\n")
+
+    return export
+
+
+def enable_opentelemetry(service_name: str = "bookstore-search"):
+    """Mirror spans into OpenTelemetry (requires `opentelemetry-api`; exporters are configured by the SDK)."""
+    from opentelemetry import metrics as otel_metrics
+    from opentelemetry import trace
+
+    tracer = trace.get_tracer(service_name)
+    histogram = otel_metrics.get_meter(service_name).create_histogram(
+        "stage_duration_seconds", unit="s", description="Duration of pipeline stages"
+    )
+
+    def export(record: Dict):
+        start_ns = int(record["start"] * 1e9)
+        span = tracer.start_span(record["name"], start_time=start_ns,
+                                 attributes={k: str(v) for k, v in record["attributes"].items()})
+        span.end(end_time=start_ns + int(record["duration"] * 1e9))
+        histogram.record(record["duration"], {"stage": record["name"]})
+
+    metrics.span_exporters.append(export)
@@ -0,0 +1,224 @@
+import json
+import os
+import sqlite3
+import threading
+from typing import Dict, Iterable, Optional, Tuple
+
+from tools.filter_tools import parse_filters_locally
+from tools.matching_tools import normalize_text
+
+# Longest phrase tried when looking for a title, author or genre in a query
+MAX_ENTITY_WORDS = 8
+
+_SCHEMA = """
+CREATE TABLE offers (
+    canonical_id TEXT NOT NULL,
+    store TEXT NOT NULL,
+    title TEXT,
+    author TEXT,
+    title_norm TEXT,
+    author_norm TEXT,
+    price REAL
+);
+CREATE TABLE book_genres (
+    genre TEXT NOT NULL,
+    canonical_id TEXT NOT NULL,
+    PRIMARY KEY (genre, canonical_id)
+) WITHOUT ROWID;
+"""
+
+# Built once all offers are in: one row per book sold by more than one store
+_MATERIALIZE = """
+CREATE INDEX offers_by_book ON offers (canonical_id, price);
+CREATE INDEX offers_by_author ON offers (author_norm);
+CREATE INDEX offers_by_title ON offers (title_norm);
+CREATE TABLE price_comparison AS
+    SELECT canonical_id,
+           MIN(title) AS title,
+           MIN(author) AS author,
+           MIN(title_norm) AS title_norm,
+           MIN(author_norm) AS author_norm,
+           COUNT(DISTINCT store) AS stores,
+           MIN(price) AS min_price,
+           MAX(price) AS max_price
+    FROM offers
+    GROUP BY canonical_id
+    HAVING COUNT(DISTINCT store) > 1;
+CREATE UNIQUE INDEX price_comparison_by_id ON price_comparison (canonical_id);
+CREATE INDEX price_comparison_by_author ON price_comparison (author_norm);
+CREATE INDEX price_comparison_by_title ON price_comparison (title_norm);
+CREATE TABLE store_prices AS
+    SELECT store, COUNT(*) AS books, AVG(price) AS average_price FROM offers GROUP BY store;
+"""
+
+
+class PriceTableBuilder:
+    """Writes the price-comparison table during ingestion.
+
+    Rows go to `<path>.building`; `publish` materializes the comparison
+    tables and indexes and atomically replaces `path`, so readers never see
+    a half-built table.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.building_path = f"{path}.building"
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        if os.path.exists(self.building_path):
+            os.remove(self.building_path)
+        self._conn = sqlite3.connect(self.building_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=OFF")
+        self._conn.execute("PRAGMA synchronous=OFF")
+        self._conn.executescript(_SCHEMA)
+
+    def add_offers(self, documents: Iterable[Dict]):
+        """Record one store's offer for each document (which must carry `canonical_id` in its metadata)."""
+        offers, genres = [], []
+        for doc in documents:
+            metadata = doc["metadata"]
+            canonical_id = metadata["canonical_id"]
+            offers.append((
+                canonical_id, doc["store"], metadata.get("title"), metadata.get("author"),
+                normalize_text(metadata.get("title")), normalize_text(metadata.get("author")),
+                metadata.get("price")
+            ))
+            book_genres = metadata.get("genre") or []
+            for genre in [book_genres] if isinstance(book_genres, str) else book_genres:
+                genres.append((normalize_text(genre), canonical_id))
+        with self._lock:
+            self._conn.executemany("INSERT INTO offers VALUES (?, ?, ?, ?, ?, ?, ?)", offers)
+            self._conn.executemany("INSERT OR IGNORE INTO book_genres VALUES (?, ?)", genres)
+
+    def publish(self) -> int:
+        """Build the comparison tables and swap them in; returns the number of cross-store books."""
+        with self._lock:
+            self._conn.executescript(_MATERIALIZE)
+            self._conn.commit()
+            matched = self._conn.execute("SELECT COUNT(*) FROM price_comparison").fetchone()[0]
+            self._conn.close()
+        os.replace(self.building_path, self.path)
+        return matched
+
+
+class PriceComparisonTable:
+    """Read side of the price-comparison table: indexed cross-store lookups by author, title or genre.
+
+    Reopens the database when ingestion swaps in a new one.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._stat: Optional[Tuple[int, float]] = None
+
+    def available(self) -> bool:
+        return os.path.exists(self.path)
+
+    def _connection(self) -> sqlite3.Connection:
+        stat = os.stat(self.path)
+        if self._conn is None or (stat.st_ino, stat.st_mtime) != self._stat:
+            if self._conn is not None:
+                self._conn.close()
+            self._conn = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True, check_same_thread=False)
+            self._stat = (stat.st_ino, stat.st_mtime)
+        return self._conn
+
+    def match_entity(self, query: str) -> Optional[Tuple[str, str]]:
+        """Find the longest phrase in `query` that is a known title, author or genre, e.g. ("author", "andy weir").
+
+        Every offer counts, not just books sold by several stores, so a book only
+        one store carries is still recognized (and `compare` finds no books).
+        """
+        words = normalize_text(query).split()
+        with self._lock:
+            conn = self._connection()
+            for size in range(min(MAX_ENTITY_WORDS, len(words)), 0, -1):
+                for start in range(len(words) - size + 1):
+                    phrase = " ".join(words[start:start + size])
+                    if conn.execute("SELECT 1 FROM offers WHERE title_norm = ? LIMIT 1", (phrase,)).fetchone():
+                        return "title", phrase
+                    # Single words are too ambiguous for author names
+                    if size > 1 and conn.execute("SELECT 1 FROM offers WHERE author_norm = ? LIMIT 1",
+                                                 (phrase,)).fetchone():
+                        return "author", phrase
+                    if conn.execute("SELECT 1 FROM book_genres WHERE genre = ? LIMIT 1", (phrase,)).fetchone():
+                        return "genre", phrase
+        return None
+
+    def compare(self, field: Optional[str] = None, value: Optional[str] = None, limit: int = 20) -> Dict:
+        """Cross-store prices for books matching `field` ("title", "author" or "genre") = `value`, or all books."""
+        if field == "genre":
+            where, params = "WHERE c.canonical_id IN (SELECT canonical_id FROM book_genres WHERE genre = ?)", (value,)
+        elif field in ("title", "author"):
+            where, params = f"WHERE c.{field}_norm = ?", (value,)
+        else:
+            where, params = "", ()
+
+        with self._lock:
+            conn = self._connection()
+            compared = conn.execute(f"SELECT COUNT(*) FROM price_comparison c {where}", params).fetchone()[0]
+            summary = conn.execute(
+                "SELECT o.store, COUNT(*), AVG(o.price), SUM(o.price = c.min_price) "
+                f"FROM price_comparison c JOIN offers o ON o.canonical_id = c.canonical_id {where} "
+                "GROUP BY o.store ORDER BY o.store", params
+            ).fetchall()
+            books = conn.execute(
+                "SELECT c.canonical_id, c.title, c.author, c.min_price, c.max_price "
+                f"FROM price_comparison c {where} ORDER BY c.max_price - c.min_price DESC LIMIT ?",
+                params + (limit,)
+            ).fetchall()
+            offers: Dict[str, Dict[str, float]] = {}
+            if books:
+                ids = [book[0] for book in books]
+                for canonical_id, store, price in conn.execute(
+                    f"SELECT canonical_id, store, price FROM offers WHERE canonical_id IN "
+                    f"({','.join('?' * len(ids))}) ORDER BY price", ids
+                ):
+                    offers.setdefault(canonical_id, {}).setdefault(store, price)
+            store_prices = conn.execute("SELECT store, books, average_price FROM store_prices ORDER BY store").fetchall()
+
+        return {
+            "matched": {field: value} if field else "all books sold by more than one store",
+            "books_compared": compared,
+            "stores": [
+                {"store": store, "books": books_count, "average_price": round(average, 2), "cheapest_count": cheapest}
+                for store, books_count, average, cheapest in summary
+            ],
+            "books": [
+                {
+                    "title": title,
+                    "author": author,
+                    "prices": offers.get(canonical_id, {}),
+                    "cheapest_store": min(offers[canonical_id], key=offers[canonical_id].get)
+                    if offers.get(canonical_id) else None,
+                    "savings": round(max_price - min_price, 2)
+                }
+                for canonical_id, title, author, min_price, max_price in books
+            ],
+            "catalog_average_price": [
+                {"store": store, "books": books_count, "average_price": round(average, 2)}
+                for store, books_count, average in store_prices
+            ]
+        }
+
+
+def compare_prices_json(table: PriceComparisonTable, query: str) -> str:
+    """Answer a cross-store price question from the table, matching an author, title or genre in the query.
+
+    Only a query that names nothing ("compare prices between stores") compares
+    every cross-store book; a named author, title or genre without cross-store
+    offers gets an explicit "no cross-store offers" answer.
+    """
+    entity = table.match_entity(query)
+    if entity is None:
+        # "by <Author Name>" for an author no store carries
+        authors = [c["match"]["value"] for c in parse_filters_locally(query)["must"] if c["key"] == "author"]
+        entity = ("author", normalize_text(authors[0])) if authors else None
+    field, value = entity if entity else (None, None)
+    comparison = table.compare(field, value)
+    if field and not comparison["books_compared"]:
+        comparison["message"] = (f"No cross-store offers for {field} '{value}': "
+                                 "no matching book is sold by more than one store.")
+    return json.dumps(comparison)
@@ -0,0 +1,209 @@
+import cProfile
+import functools
+import os
+import pstats
+import re
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from contextlib import contextmanager
+from typing import List, Optional, Set
+
+PROFILE_MODES = ("cprofile", "sample", "memory")
+
+# cProfile and tracemalloc are process-global, so only one profile runs at a time
+_profile_lock = threading.Lock()
+
+
+def _output_path(out_dir: str, name: str, extension: str) -> str:
+    os.makedirs(out_dir, exist_ok=True)
+    slug = re.sub(r"[^a-z0-9]+", "-", name.lower()).strip("-")[:60] or "profile"
+    return os.path.join(out_dir, f"{time.strftime('%Y%m%d-%H%M%S')}-{slug}.{extension}")
+
+
+# From Python 3.12 cProfile sits on sys.monitoring: one enabled profiler already sees
+# every thread, and enabling a second one anywhere raises ValueError
+_PROCESS_WIDE_CPROFILE = sys.version_info >= (3, 12)
+
+
+class CrossThreadProfile:
+    """A cProfile session that follows work handed off to other threads.
+
+    Before Python 3.12 a `cProfile.Profile` only sees the thread that enabled
+    it, while searches run on the RAG event loop thread and in executor
+    workers. Each thread joining the session gets its own profiler; `dump`
+    merges them. On 3.12+ the first profiler covers every thread, so joining
+    is a no-op.
+    """
+
+    def __init__(self):
+        self.profilers: List[cProfile.Profile] = []
+        self._threads: Set[int] = set()
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def thread(self):
+        """Profile the current thread for the duration of the block (no-op if it already is)."""
+        ident = threading.get_ident()
+        with self._lock:
+            joined = ident not in self._threads and not (_PROCESS_WIDE_CPROFILE and self._threads)
+            if joined:
+                self._threads.add(ident)
+        if not joined:
+            yield
+            return
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError as e:
+            # Another profiling tool is active; profiling must never stop the work itself
+            print(f"⚠️ cProfile not started on {threading.current_thread().name}: {e}")
+            with self._lock:
+                self._threads.discard(ident)
+            profiler = None
+        try:
+            yield
+        finally:
+            if profiler is not None:
+                profiler.disable()
+                with self._lock:
+                    self._threads.discard(ident)
+                    self.profilers.append(profiler)
+
+    def dump(self, path: str):
+        stats = pstats.Stats()
+        with self._lock:
+            stats.add(*(profiler for profiler in self.profilers if profiler.getstats()))
+        stats.dump_stats(path)
+
+
+# The running cProfile block, if any, that worker threads should join
+_active_cprofile: Optional[CrossThreadProfile] = None
+
+
+@contextmanager
+def profile_current_thread():
+    """Extend a running cProfile block to this thread; use it where work is handed off to another thread."""
+    session = _active_cprofile
+    if session is None:
+        yield
+        return
+    with session.thread():
+        yield
+
+
+def profiled(fn):
+    """Wrap `fn` before passing it to another thread (`asyncio.to_thread`, executors) so cProfile sees it."""
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        with profile_current_thread():
+            return fn(*args, **kwargs)
+    return wrapper
+
+
+class StackSampler:
+    """Sampling profiler that records collapsed stacks from every thread.
+
+    Output is in the folded format (`frame;frame;frame count`) understood by
+    flamegraph.pl, speedscope and inferno.
+    """
+
+    def __init__(self, interval: float = 0.005):
+        self.interval = interval
+        self.samples: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        own_id = threading.get_ident()
+        names = {}
+        while not self._stop.wait(self.interval):
+            if len(names) != threading.active_count():
+                names = {t.ident: t.name for t in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                    frame = frame.f_back
+                stack.append(names.get(thread_id, str(thread_id)))
+                self.samples[";".join(reversed(stack))] += 1
+
+    def write_folded(self, path: str):
+        with open(path, 'w') as f:
+            for stack, count in self.samples.most_common():
+                f.write(f"{stack} {count}\n")
+
+
+@contextmanager
+def profile_block(name: str, mode: Optional[str], out_dir: str = "results/profiles"):
+    """Profile everything run inside the block and write the result under `out_dir`.
+
+    Modes: "cprofile" (.prof, for snakeviz/flameprof), "sample" (.folded
+    collapsed stacks for flamegraphs) and "memory" (tracemalloc peak and top
+    allocation sites). A falsy mode, or another profile already running, makes
+    this a no-op. Before Python 3.12 "cprofile" covers other threads only where
+    work is handed off through `profiled` or `profile_current_thread`; "sample"
+    sees every thread.
+    """
+    if not mode:
+        yield
+        return
+    if mode not in PROFILE_MODES:
+        raise ValueError(f"Unknown profile mode '{mode}', expected one of {PROFILE_MODES}")
+    if not _profile_lock.acquire(blocking=False):
+        print(f"⚠️ Skipping profile of '{name}': another profile is already running")
+        yield
+        return
+
+    try:
+        if mode == "cprofile":
+            global _active_cprofile
+            session = _active_cprofile = CrossThreadProfile()
+            try:
+                with session.thread():
+                    yield
+            finally:
+                _active_cprofile = None
+                path = _output_path(out_dir, name, "prof")
+                session.dump(path)
+                print(f"🔬 cProfile output (merged from {len(session.profilers)} thread profiles) written to {path}")
+
+        elif mode == "sample":
+            sampler = StackSampler()
+            sampler.start()
+            try:
+                yield
+            finally:
+                sampler.stop()
+                path = _output_path(out_dir, name, "folded")
+                sampler.write_folded(path)
+                print(f"🔬 Collapsed stacks ({sum(sampler.samples.values())} samples) written to {path}")
+
+        else:
+            tracemalloc.start(25)
+            try:
+                yield
+            finally:
+                _, peak = tracemalloc.get_traced_memory()
+                snapshot = tracemalloc.take_snapshot()
+                tracemalloc.stop()
+                path = _output_path(out_dir, name, "memory.txt")
+                with open(path, 'w') as f:
+                    f.write(f"Peak traced memory: {peak / 1024 / 1024:.1f} MiB\n\nTop allocation sites:\n")
+                    for stat in snapshot.statistics("lineno")[:25]:
+                        f.write(f"{stat}\n")
+                print(f"🔬 Peak traced memory for '{name}': {peak / 1024 / 1024:.1f} MiB (details in {path})")
+    finally:
+        _profile_lock.release()
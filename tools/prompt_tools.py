@@ -1,64 +1,102 @@
 import json
+from typing import Dict, List
 
-# Normalized schema for the vector store
-NORMALIZED_SCHEMA = {
-    "fields": ["title", "author", "price", "genre", "publication_year", "rating", "reviews_count", "store"],
-    "field_types": {
-        "title": "string",
-        "author": "string",
-        "price": "float",
-        "genre": "string or array of strings",
-        "publication_year": "integer",
-        "rating": "float",
-        "reviews_count": "integer",
-        "store": "string"
-    },
-    "filterable_fields": ["author", "price", "genre", "publication_year", "rating", "reviews_count", "store"]
-}
-
-def generate_filter_query_prompt(user_query: str) -> str:
-    """
-    Generates a detailed prompt for an LLM to convert a natural language user query
-    into a Qdrant filter JSON object.
-
-    This function constructs a prompt that includes:
-    - The available data schemas for different bookstores.
-    - Mappings between similar fields across different stores (e.g., 'author' vs. 'writer').
-    - The user's natural language query.
-    - Examples of the expected Qdrant filter JSON format.
-    - A set of rules for the LLM to follow to ensure consistent and accurate filter generation.
+from tools.store_adapters import build_normalized_schema
 
-    Args:
-        user_query: The natural language query from the user.
+# Normalized schema for the vector store, derived from the registered store adapters
+NORMALIZED_SCHEMA = build_normalized_schema()
 
-    Returns:
-        A formatted string that serves as a prompt for the LLM.
-    """
-    schema_info = json.dumps(NORMALIZED_SCHEMA, indent=2)
-    
-    prompt = f"""
-You are an expert at converting natural language queries into Qdrant database filters.
+# Everything that doesn't depend on the query lives in this constant system prompt, built once, with
+# the query in a separate final message. At roughly 500 tokens it is below OpenAI's 1,024-token
+# prompt-caching minimum, so it is kept short rather than cached: `cached_input` stays 0.
+FILTER_SYSTEM_PROMPT = f"""You are an expert at converting natural language queries into Qdrant database filters.
 
 Here is the normalized schema of the data in the vector store:
-{schema_info}
+{json.dumps(NORMALIZED_SCHEMA, separators=(",", ":"))}
 
-USER QUERY: "{user_query}"
-
-Based on the user's query and the schema, generate a Qdrant filter. Return ONLY the valid JSON.
+Given the user's query, generate a Qdrant filter. Every condition has a "key" and either a "match" or a "range"; set the other one to null.
 
 FILTER FORMAT EXAMPLES:
-1. Price filter: {{"must": [{{"key": "price", "range": {{"gte": 10, "lte": 20}}}}]}}
-2. Author filter: {{"must": [{{"key": "author", "match": {{"value": "Stephen King"}}}}]}}
-3. Genre filter: {{"must": [{{"key": "genre", "match": {{"value": "Science Fiction"}}}}]}}
-4. Multiple filters: {{"must": [{{"key": "author", "match": {{"value": "Andy Weir"}}}}, {{"key": "price", "range": {{"lte": 20}}}}]}}
+1. Price filter: {{"must": [{{"key": "price", "match": null, "range": {{"gte": 10, "lte": 20, "gt": null, "lt": null}}}}]}}
+2. Author filter: {{"must": [{{"key": "author", "match": {{"value": "Stephen King"}}, "range": null}}]}}
+3. Genre filter: {{"must": [{{"key": "genre", "match": {{"value": "science fiction"}}, "range": null}}]}}
+4. Multiple filters: {{"must": [{{"key": "author", "match": {{"value": "Andy Weir"}}, "range": null}}, {{"key": "price", "match": null, "range": {{"gte": null, "lte": 20, "gt": null, "lt": null}}}}]}}
 
 RULES:
 1. ONLY use the fields available in the `filterable_fields` list from the schema.
 2. Do NOT invent fields. Do NOT use fields like 'category'. The only field for book category is 'genre'.
-3. For genre queries, create a filter for the 'genre' field.
+3. For genre queries, create a filter for the 'genre' field. Genres are stored in lowercase.
 4. For price comparisons (e.g., 'cheaper', 'expensive'), create appropriate ranges for the 'price' field.
-5. For popularity queries (e.g., 'popular', 'highly-rated'), use 'rating' > 4.0 or 'reviews_count' > 500.
+5. Popularity ('popular', 'highly rated') alone is NOT a filter: 'rating' and 'reviews_count' each exist in only one store, so either condition drops the other store's books.
+6. Filter on 'store' only when the query names exactly one store, using its id from `stores`.
+7. For years, 'after X' is 'publication_year' > X, 'before X' is < X, 'since X' is >= X and 'until X' is <= X.
+
+If no specific filters are needed for the query, return: {{"must": []}}"""
+
+_NULLABLE_NUMBER = {"type": ["number", "null"]}
+
+
+def _condition_schema(keys: List[str], value_schema: Dict) -> Dict:
+    """Strict JSON schema for one filter condition on any of `keys`."""
+    return {
+        "type": "object",
+        "additionalProperties": False,
+        "required": ["key", "match", "range"],
+        "properties": {
+            "key": {"type": "string", "enum": keys},
+            "match": {"anyOf": [
+                {"type": "null"},
+                {
+                    "type": "object",
+                    "additionalProperties": False,
+                    "required": ["value"],
+                    "properties": {"value": value_schema}
+                }
+            ]},
+            "range": {"anyOf": [
+                {"type": "null"},
+                {
+                    "type": "object",
+                    "additionalProperties": False,
+                    "required": ["gte", "lte", "gt", "lt"],
+                    "properties": {bound: _NULLABLE_NUMBER for bound in ("gte", "lte", "gt", "lt")}
+                }
+            ]}
+        }
+    }
+
+
+# Structured output (OpenAI strict JSON schema mode): the response always parses into this shape.
+# Store conditions get their own branch so the value is always a registered store id (a shard key).
+FILTER_RESPONSE_FORMAT = {
+    "type": "json_schema",
+    "json_schema": {
+        "name": "qdrant_filter",
+        "strict": True,
+        "schema": {
+            "type": "object",
+            "additionalProperties": False,
+            "required": ["must"],
+            "properties": {
+                "must": {
+                    "type": "array",
+                    "items": {"anyOf": [
+                        _condition_schema(
+                            [key for key in NORMALIZED_SCHEMA["filterable_fields"] if key != "store"],
+                            {"type": ["string", "number"]}
+                        ),
+                        _condition_schema(["store"], {"type": "string", "enum": NORMALIZED_SCHEMA["stores"]})
+                    ]}
+                }
+            }
+        }
+    }
+}
+
 
-If no specific filters are needed for the query, return: {{"must": []}}
-"""
-    return prompt
+def build_filter_messages(user_query: str) -> List[Dict]:
+    """Chat messages for filter generation: the constant system prefix, then the query."""
+    return [
+        {"role": "system", "content": FILTER_SYSTEM_PROMPT},
+        {"role": "user", "content": f'USER QUERY: "{user_query}"'}
+    ]
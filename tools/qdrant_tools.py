@@ -1,11 +1,68 @@
-from typing import Dict, Optional, List
+import time
+from typing import Dict, Optional, List, Union
 from qdrant_client import QdrantClient
-from qdrant_client.models import Filter, FieldCondition, MatchValue, Range, SearchParams
+from qdrant_client.models import (
+    Filter, FieldCondition, MatchAny, MatchValue, QueryRequest, Range, SearchParams, ShardingMethod
+)
+
+from tools.metrics_tools import metrics
+from tools.store_adapters import STORE_ADAPTERS
 
 class QdrantSearcher:
-    def __init__(self, client: QdrantClient, collection_name: str):
+    def __init__(self, client: QdrantClient, collection_name: str, shard_key_field: Optional[str] = None,
+                 sharding_check_interval: float = 30.0):
         self.client = client
         self.collection_name = collection_name
+        # Payload field used as the custom shard key ("store") when the live collection is sharded.
+        # Whether it is comes from the collection itself (re-read every `sharding_check_interval`
+        # seconds), since a reindex can swap a sharded collection for an unsharded one or back.
+        self.shard_key_field = shard_key_field
+        self.sharding_check_interval = sharding_check_interval
+        self._sharded: Optional[bool] = None
+        self._sharding_checked_at = 0.0
+
+    def is_sharded(self) -> bool:
+        """Whether the collection behind `collection_name` (an alias) uses custom sharding."""
+        now = time.monotonic()
+        if self._sharded is None or now - self._sharding_checked_at > self.sharding_check_interval:
+            try:
+                params = self.client.get_collection(collection_name=self.collection_name).config.params
+                self._sharded = params.sharding_method == ShardingMethod.CUSTOM
+            except Exception as e:
+                print(f"Error reading sharding method of {self.collection_name}: {e}")
+                self._sharded = False
+            self._sharding_checked_at = now
+        return self._sharded
+
+    def shard_keys_for(self, qdrant_filter: Optional[Filter]) -> Optional[List[str]]:
+        """Shard keys a filter pins the search to, or None to search every shard."""
+        if self.shard_key_field is None or qdrant_filter is None or not qdrant_filter.must:
+            return None
+        if not self.is_sharded():
+            return None
+        keys = None
+        for condition in qdrant_filter.must:
+            if not isinstance(condition, FieldCondition) or condition.key != self.shard_key_field:
+                continue
+            if isinstance(condition.match, MatchValue):
+                values = {condition.match.value}
+            elif isinstance(condition.match, MatchAny):
+                values = set(condition.match.any)
+            else:
+                continue
+            # Several `must` conditions on the shard key all have to hold
+            keys = values if keys is None else keys & values
+        if keys is None:
+            return None
+        # Ingestion creates one shard key per registered store, and Qdrant rejects unknown keys
+        # (e.g. an LLM's "Store A"); search every shard and let the filter itself decide
+        keys &= STORE_ADAPTERS.keys()
+        return sorted(keys) if keys else None
+
+    def _record_routing(self, shard_keys: Optional[List[str]]):
+        if self.shard_key_field is not None and self._sharded:
+            metrics.increment("qdrant_searches_total", help="Qdrant searches by shard routing",
+                              routing="shard_key" if shard_keys else "all_shards")
 
     def build_qdrant_filter(self, filter_dict: Dict) -> Optional[Filter]:
         """Convert filter dictionary to Qdrant Filter object"""
@@ -16,10 +73,12 @@ class QdrantSearcher:
             conditions = []
             for condition in filter_dict["must"]:
                 key = condition["key"]
-                
-                if "match" in condition:
-                    match_condition = condition["match"]
-                    if "value" in match_condition:
+                # Structured output sets whichever of match/range is unused to null
+                match_condition = condition.get("match")
+                range_condition = condition.get("range")
+
+                if match_condition:
+                    if match_condition.get("value") is not None:
                         conditions.append(
                             FieldCondition(key=key, match=MatchValue(value=match_condition["value"]))
                         )
@@ -29,19 +88,10 @@ class QdrantSearcher:
                                 FieldCondition(key=key, match=MatchValue(value=value))
                             )
                 
-                elif "range" in condition:
-                    range_condition = condition["range"]
-                    conditions.append(
-                        FieldCondition(
-                            key=key,
-                            range=Range(
-                                gte=range_condition.get("gte"),
-                                lte=range_condition.get("lte"),
-                                gt=range_condition.get("gt"),
-                                lt=range_condition.get("lt")
-                            )
-                        )
-                    )
+                elif range_condition:
+                    bounds = {bound: range_condition.get(bound) for bound in ("gte", "lte", "gt", "lt")}
+                    if any(value is not None for value in bounds.values()):
+                        conditions.append(FieldCondition(key=key, range=Range(**bounds)))
             
             return Filter(must=conditions) if conditions else None
         except Exception as e:
@@ -49,38 +99,81 @@ class QdrantSearcher:
             return None
 
     def scroll_all(self, limit: int = 1000) -> List:
-        """Scroll through all documents in the collection"""
+        """Scroll through all documents in the collection; raises rather than return a partial scan"""
         all_points = []
         next_offset = None
         
-        while True:
-            try:
-                results, next_offset = self.client.scroll(
-                    collection_name=self.collection_name,
-                    limit=limit,
-                    offset=next_offset,
-                    with_payload=True
-                )
+        with metrics.span("qdrant_scroll"):
+            while True:
+                try:
+                    results, next_offset = self.client.scroll(
+                        collection_name=self.collection_name,
+                        limit=limit,
+                        offset=next_offset,
+                        with_payload=True
+                    )
+                except Exception as e:
+                    print(f"Error during Qdrant scroll: {e}")
+                    raise
                 all_points.extend(results)
                 if next_offset is None:
                     break
-            except Exception as e:
-                print(f"Error during Qdrant scroll: {e}")
-                break
                 
         return all_points
 
     def search(self, query_embedding: List[float], qdrant_filter: Optional[Filter], limit: int) -> List:
-        """Perform a search in Qdrant"""
+        """Perform a search in Qdrant; errors are raised so callers don't mistake them for no results"""
+        shard_keys = self.shard_keys_for(qdrant_filter)
+        self._record_routing(shard_keys)
         try:
-            return self.client.query_points(
-                collection_name=self.collection_name,
-                query=query_embedding,
-                query_filter=qdrant_filter,
-                limit=limit,
-                with_payload=True,
-                search_params=SearchParams(hnsw_ef=128, exact=False)
-            )
+            with metrics.span("qdrant_search"):
+                return self.client.query_points(
+                    collection_name=self.collection_name,
+                    query=query_embedding,
+                    query_filter=qdrant_filter,
+                    limit=limit,
+                    with_payload=True,
+                    search_params=SearchParams(hnsw_ef=128, exact=False),
+                    shard_key_selector=shard_keys
+                )
         except Exception as e:
             print(f"Error during Qdrant search: {e}")
-            return []
+            self._sharded = None  # the alias may have moved to a collection with another layout
+            raise
+
+    def search_batch(self, query_embeddings: List[List[float]], qdrant_filters: List[Optional[Filter]],
+                     limit: int, batch_size: int = 256) -> List[Union[List, Exception]]:
+        """Run many searches with `query_batch_points`; returns one list of points per query, in order.
+
+        A failed request batch puts its exception in place of each of its queries' points,
+        so one bad batch doesn't pass off its queries as having no matches.
+        """
+        results = []
+        for start in range(0, len(query_embeddings), batch_size):
+            requests = [
+                QueryRequest(
+                    query=embedding,
+                    filter=qdrant_filter,
+                    limit=limit,
+                    with_payload=True,
+                    params=SearchParams(hnsw_ef=128, exact=False),
+                    shard_key=self.shard_keys_for(qdrant_filter)
+                )
+                for embedding, qdrant_filter in zip(
+                    query_embeddings[start:start + batch_size], qdrant_filters[start:start + batch_size]
+                )
+            ]
+            for request in requests:
+                self._record_routing(request.shard_key)
+            try:
+                with metrics.span("qdrant_batch_search", queries=len(requests)):
+                    responses = self.client.query_batch_points(
+                        collection_name=self.collection_name,
+                        requests=requests
+                    )
+                results.extend(response.points for response in responses)
+            except Exception as e:
+                print(f"Error during Qdrant batch search: {e}")
+                self._sharded = None
+                results.extend(e for _ in requests)
+        return results
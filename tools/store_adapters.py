@@ -0,0 +1,117 @@
+import uuid
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, Iterator, List
+
+# Types of the normalized fields every store feed is mapped onto
+NORMALIZED_FIELD_TYPES = {
+    "title": "string",
+    "author": "string",
+    "price": "float",
+    "genre": "string or array of strings",
+    "publication_year": "integer",
+    "rating": "float",
+    "reviews_count": "integer",
+    "store": "string"
+}
+FILTERABLE_FIELDS = ["author", "price", "genre", "publication_year", "rating", "reviews_count", "store"]
+
+
+def lowercase(value: Any) -> Any:
+    """Lowercase a string or every string in a list (genres/categories)."""
+    if isinstance(value, list):
+        return [v.lower() for v in value]
+    return value.lower()
+
+
+@dataclass
+class StoreAdapter:
+    """Declarative mapping from one store's feed schema onto the normalized schema."""
+    store: str
+    feed: str  # path or glob of the store's feed files
+    text_field: str  # source field that gets embedded
+    field_map: Dict[str, str]  # normalized (payload) field -> source field
+    defaults: Dict[str, Any] = field(default_factory=dict)  # for optional source fields
+    transforms: Dict[str, Callable[[Any], Any]] = field(default_factory=dict)
+
+    def normalize(self, record: Dict) -> Dict:
+        metadata = {}
+        for target, source in self.field_map.items():
+            if source in record:
+                value = record[source]
+            elif target in self.defaults:
+                value = self.defaults[target]
+            else:
+                raise KeyError(f"{self.store} record is missing required field '{source}'")
+            transform = self.transforms.get(target)
+            metadata[target] = transform(value) if transform else value
+
+        return {
+            "id": str(uuid.uuid4()),
+            "text": record[self.text_field],  # This will be embedded
+            "store": self.store,
+            "metadata": metadata
+        }
+
+    def iter_documents(self, records: Iterable[Dict]) -> Iterator[Dict]:
+        for record in records:
+            yield self.normalize(record)
+
+
+STORE_ADAPTERS: Dict[str, StoreAdapter] = {}
+
+def register_store_adapter(adapter: StoreAdapter) -> StoreAdapter:
+    """Add (or replace) a store feed. Register before importing tools.prompt_tools so the schema includes it."""
+    STORE_ADAPTERS[adapter.store] = adapter
+    return adapter
+
+
+def build_normalized_schema(adapters: Iterable[StoreAdapter] = None) -> Dict:
+    """Describe the fields the registered stores actually provide, for the filter-generation prompt."""
+    adapters = list(adapters if adapters is not None else STORE_ADAPTERS.values())
+    available = {"store"}.union(*(adapter.field_map for adapter in adapters))
+    fields: List[str] = [f for f in NORMALIZED_FIELD_TYPES if f in available]
+    return {
+        "fields": fields,
+        "field_types": {f: NORMALIZED_FIELD_TYPES[f] for f in fields},
+        "filterable_fields": [f for f in FILTERABLE_FIELDS if f in available],
+        "stores": [adapter.store for adapter in adapters]
+    }
+
+
+register_store_adapter(StoreAdapter(
+    store="store_a",
+    feed="data/store_a_books.json",
+    text_field="description",
+    field_map={
+        "title": "title",
+        "author": "author",
+        "price": "price",
+        "publication_year": "publication_year",
+        "isbn": "isbn",
+        "book_id": "book_id",
+        "genre": "genre",
+        "rating": "rating"
+    },
+    defaults={"isbn": ""},
+    transforms={"genre": lowercase}
+))
+
+register_store_adapter(StoreAdapter(
+    store="store_b",
+    feed="data/store_b_books.json",
+    text_field="summary",
+    field_map={
+        "title": "book_name",
+        "author": "writer",
+        "price": "cost",
+        "publication_year": "publication_year",
+        "isbn": "isbn",
+        "product_id": "product_id",
+        "genre": "category",
+        "reviews_count": "reviews_count",
+        "publisher": "publisher",
+        "stock": "stock"
+    },
+    defaults={"publication_year": 2020, "isbn": "", "publisher": ""},
+    transforms={"genre": lowercase}
+))
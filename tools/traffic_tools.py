@@ -0,0 +1,87 @@
+import json
+import os
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, List, Optional
+
+from tools.metrics_tools import collect_timings
+
+# The log entry of the request being served, so lower layers (caches, coalescing) can annotate it
+_current_request: ContextVar[Optional[Dict]] = ContextVar("current_request", default=None)
+
+
+def annotate_request(**fields):
+    """Add fields to the current request's log entry; a no-op outside `RequestLog.record`."""
+    entry = _current_request.get()
+    if entry is not None:
+        entry.update(fields)
+
+
+def record_cache_lookup(namespace: str, outcome: str):
+    entry = _current_request.get()
+    if entry is not None:
+        entry["cache"][namespace] = outcome
+
+
+class RequestLog:
+    """Append-only JSON-lines log of served requests, for replay and capacity planning.
+
+    Each line holds the timestamp, route, query, status, end-to-end latency,
+    per-stage timings and the response cache outcome of every lookup made
+    while serving the request.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._file = open(path, 'a', buffering=1)
+
+    @contextmanager
+    def record(self, route: str, query: str, **fields):
+        entry = {"timestamp": round(time.time(), 3), "route": route, "query": query, **fields,
+                 "status": 200, "cache": {}}
+        token = _current_request.set(entry)
+        start = time.perf_counter()
+        try:
+            with collect_timings() as timings:
+                yield entry
+        except Exception as e:
+            if entry["status"] == 200:
+                entry["status"] = getattr(e, "status_code", 500)
+            entry["error"] = type(e).__name__
+            raise
+        finally:
+            _current_request.reset(token)
+            entry["latency"] = round(time.perf_counter() - start, 6)
+            entry["timings"] = timings
+            self.write(entry)
+
+    def write(self, entry: Dict):
+        line = json.dumps(entry) + "\n"
+        with self._lock:
+            self._file.write(line)
+
+    def close(self):
+        self._file.close()
+
+
+def iter_request_log(path: str, routes: Optional[List[str]] = None) -> Iterator[Dict]:
+    """Yield logged requests in order, optionally only those for `routes`."""
+    with open(path) as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            entry = json.loads(line)
+            if routes is None or entry["route"] in routes:
+                yield entry
+
+
+def top_queries(path: str, n: int, routes: Optional[List[str]] = None) -> List[str]:
+    """The `n` most frequent queries in a request log."""
+    counts = Counter(entry["query"] for entry in iter_request_log(path, routes))
+    return [query for query, _ in counts.most_common(n)]